@@ -1,15 +1,73 @@
+import io
 import os
+import re
+import csv
+import random
 import uuid
-from datetime import datetime
-
-from flask import Flask, request, jsonify, send_from_directory
+import glob
+import shutil
+import gzip
+import hashlib
+import mimetypes
+import json
+import time
+import base64
+import bisect
+import queue
+import select
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import zipfile
+import itertools
+import zlib
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, Request, g, request, jsonify, send_from_directory, stream_with_context
 import click
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, event, tuple_, func, table, column, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.security import safe_join
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
 from werkzeug.utils import secure_filename
 import bcrypt
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it catalog cards use originals
+    Image = ImageOps = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: there is only ever one server process there
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is the fallback
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; backups fall back to gzip
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
 # -----------------------------------------------------------------------------
 # App setup
 # -----------------------------------------------------------------------------
@@ -25,18 +83,53 @@ if os.path.exists(custom_db_path):
         print(f"Using custom database path: {DB_PATH}")
     except Exception:
         print("Could not read custom database path, using default")
+# An explicit environment override wins (benchmarks, scratch databases)
+if os.environ.get('CRAFTCHAIN_DB_PATH'):
+    DB_PATH = os.path.abspath(os.environ['CRAFTCHAIN_DB_PATH'])
 STATIC_DIR = os.path.join(BASE_DIR, 'static')
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
-UPLOAD_DIR = os.path.join(STATIC_DIR, 'uploads')
+# Uploads are served under /static/uploads/ wherever they live on disk
+UPLOAD_DIR = os.path.abspath(os.environ.get('CRAFTCHAIN_UPLOAD_DIR') or os.path.join(STATIC_DIR, 'uploads'))
 PICS_DIR = os.path.join(BASE_DIR, 'pics')
 LOGOS_DIR = os.path.join(BASE_DIR, 'logos')
 GOVT_UPLOAD_DIR = os.path.join(UPLOAD_DIR, 'govt_ids')
 PRODUCT_UPLOAD_DIR = os.path.join(UPLOAD_DIR, 'products')
+THUMBNAIL_DIR = os.path.join(PRODUCT_UPLOAD_DIR, 'thumbs')
 
 os.makedirs(GOVT_UPLOAD_DIR, exist_ok=True)
 os.makedirs(PRODUCT_UPLOAD_DIR, exist_ok=True)
+os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+
+class AppRequest(Request):
+    """Request with per-endpoint body size limits (MAX_CONTENT_LENGTH_BY_ENDPOINT).
+
+    File parts posted to an endpoint in UPLOAD_KINDS_BY_ENDPOINT are written
+    straight into that kind's upload directory as they arrive (UploadSpool)
+    instead of Werkzeug's spooled temp file, and rejected early if they break
+    the kind's UPLOAD_LIMITS.
+    """
+
+    @property
+    def max_content_length(self):
+        limits = app.config.get('MAX_CONTENT_LENGTH_BY_ENDPOINT', {})
+        if self.endpoint in limits:
+            return limits[self.endpoint]
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        kind = app.config['UPLOAD_KINDS_BY_ENDPOINT'].get(self.endpoint)
+        # Browsers send an unselected file input as an empty part with filename="";
+        # leave it to the view (update_product ignores it, save_file rejects it)
+        if kind is None or not filename:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        limits = app.config['UPLOAD_LIMITS'][kind]
+        if content_length and content_length > limits['max_bytes']:
+            raise RequestEntityTooLarge(upload_limit_message(limits['max_bytes']))
+        return UploadSpool(os.path.join(UPLOAD_DIR, kind), limits['max_bytes'], limits['types'])
+
 
 app = Flask(__name__, static_folder=STATIC_DIR, static_url_path='/static')
+app.request_class = AppRequest
 CORS(app)
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
 # Give SQLite more time to wait on locks before failing
@@ -48,26 +141,173 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 }
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB file uploads
+app.config['MAX_CONTENT_LENGTH_BY_ENDPOINT'] = {
+    'import_products_api': 512 * 1024 * 1024,  # manifest + zip of a whole inventory
+}
 app.config['SECRET_KEY'] = app.config.get('SECRET_KEY') or 'dev-secret-change-me'
+# Keyset pagination for GET /api/products (opt-in via ?limit= / ?cursor=)
+app.config['PRODUCTS_DEFAULT_PAGE_SIZE'] = 24
+app.config['PRODUCTS_MAX_PAGE_SIZE'] = 100
+# Most products one bulk moderation request may name (ids) or match (filter)
+app.config['BULK_MODERATION_MAX_IDS'] = 1000
+# Bulk product import: rows per insert transaction, parallel image writers
+app.config['IMPORT_BATCH_SIZE'] = 500
+app.config['IMPORT_IMAGE_WORKERS'] = min(8, os.cpu_count() or 1)
+# Rows per id-ordered query when exporting tables
+app.config['EXPORT_CHUNK_SIZE'] = 1000
+# Signed login tokens (all roles) and the LRU of already-verified ones
+app.config['AUTH_TOKEN_MAX_AGE'] = 60 * 60 * 8  # 8 hours
+app.config['AUTH_TOKEN_CACHE_SIZE'] = 1024
+app.config['AUTH_TOKEN_CACHE_TTL'] = 300  # seconds a verified token (and its role) is trusted without re-checking
+# Rows fetched per round trip when a listing is streamed with format=ndjson
+app.config['STREAM_BATCH_SIZE'] = 500
+# In-process cache of serialized approved-catalog listings. The TTL bounds how
+# long edits made outside this process (CLI, DB Browser) take to show up.
+app.config['CATALOG_CACHE_ENABLED'] = True
+app.config['CATALOG_CACHE_TTL'] = 30  # seconds
+app.config['CATALOG_CACHE_MAX_ENTRIES'] = 256
+app.config['CATALOG_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+# bcrypt work factor for new hashes and the pool that runs hashing off the
+# request thread; requests beyond workers + max pending get a 503.
+app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
+app.config['PASSWORD_POOL_WORKERS'] = min(4, os.cpu_count() or 1)
+app.config['PASSWORD_POOL_MAX_PENDING'] = 16
+app.config['PASSWORD_POOL_RETRY_AFTER'] = 2  # seconds
+# Pragmas applied to every new SQLite connection (only journal_mode=WAL is
+# stored in the file). cache_size is per connection, in KiB; the mmap window
+# is shared through the OS page cache, so reads skip a copy per page.
+app.config['SQLITE_PRAGMAS'] = {
+    'busy_timeout': 30000,  # ms to wait for a lock
+    'foreign_keys': 'ON',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size_kib': int(os.environ.get('SQLITE_CACHE_SIZE_KIB', 40 * 1024)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes; 0 disables
+    'wal_autocheckpoint': 1000,  # WAL pages before a commit checkpoints
+}
+# All writes go through one committer thread that group-commits queued jobs
+app.config['WRITE_QUEUE_MAX_BATCH'] = 64
+app.config['WRITE_QUEUE_MAX_RETRIES'] = 5
+app.config['WRITE_QUEUE_TIMEOUT'] = 30  # seconds a request waits for its commit
+app.config['WRITE_QUEUE_RETRY_AFTER'] = 5  # seconds (Retry-After on 503 when that runs out)
+# Resized product image derivatives, rendered in the background (needs Pillow)
+app.config['THUMBNAIL_WIDTHS'] = (320, 640, 1024)
+app.config['THUMBNAIL_JPEG_QUALITY'] = 82
+app.config['THUMBNAIL_WEBP_QUALITY'] = 80
+# Uploads are stored by content hash; orphans younger than this are left alone
+# because a concurrent upload of the same bytes may be about to reference them
+app.config['UPLOAD_GC_GRACE'] = 3600  # seconds
+# Per-kind upload limits, checked while the body streams in; the content type
+# is sniffed from the file's magic bytes, not taken from the client
+app.config['UPLOAD_LIMITS'] = {
+    'products': {'max_bytes': 10 * 1024 * 1024, 'types': ('image/jpeg', 'image/png', 'image/webp', 'image/gif')},
+    'govt_ids': {'max_bytes': 5 * 1024 * 1024, 'types': ('image/jpeg', 'image/png', 'application/pdf')},
+}
+app.config['UPLOAD_KINDS_BY_ENDPOINT'] = {
+    'create_product': 'products',
+    'update_product': 'products',
+    'register_seller': 'govt_ids',
+}
+# Browser caching for static assets; uploads have content-derived names so never change
+app.config['UPLOAD_MAX_AGE'] = 365 * 24 * 3600
+app.config['ASSET_MAX_AGE'] = 3600  # css/js/pics/logos, revalidated with ETags afterwards
+# `flask serve`: worker processes sharing one listening socket, each with a
+# fixed pool of request threads (Windows runs a single process)
+app.config['SERVE_WORKERS'] = os.cpu_count() or 1
+app.config['SERVE_THREADS'] = 8
+app.config['SERVE_SOCKET_TIMEOUT'] = 15  # seconds an idle keep-alive or stalled client holds a thread
+app.config['SERVE_GRACEFUL_TIMEOUT'] = 30  # seconds a stopping worker may spend finishing requests
+app.config['SERVE_READY_TIMEOUT'] = 60  # seconds a new worker has to start listening
+# In-app database maintenance, run by one process at a time: checkpoint the
+# WAL once it grows, and refresh planner statistics / return free pages to the
+# filesystem while traffic is low
+app.config['MAINTENANCE_ENABLED'] = True
+app.config['MAINTENANCE_INTERVAL'] = 30  # seconds between checks
+app.config['MAINTENANCE_IDLE_SECONDS'] = 10  # no requests or commits for this long counts as low traffic
+app.config['MAINTENANCE_BUSY_TIMEOUT'] = 200  # ms a maintenance statement waits for a lock before giving up
+app.config['MAINTENANCE_WAL_CHECKPOINT_BYTES'] = 64 * 1024 * 1024
+app.config['MAINTENANCE_OPTIMIZE_INTERVAL'] = 3600
+app.config['MAINTENANCE_ANALYSIS_LIMIT'] = 1000  # rows ANALYZE samples per index
+app.config['MAINTENANCE_VACUUM_INTERVAL'] = 3600
+app.config['MAINTENANCE_VACUUM_MIN_FREE_PAGES'] = 1024
+app.config['MAINTENANCE_VACUUM_STEP_PAGES'] = 256  # pages freed per short transaction
+# Online backups through SQLite's backup API (flask backup, and every
+# BACKUP_INTERVAL seconds from the maintenance scheduler when set). Pages are
+# copied BACKUP_STEP_PAGES at a time with a pause in between.
+app.config['BACKUP_DIR'] = os.environ.get('CRAFTCHAIN_BACKUP_DIR', os.path.join(BASE_DIR, 'backups'))
+app.config['BACKUP_INTERVAL'] = int(os.environ['CRAFTCHAIN_BACKUP_INTERVAL']) if os.environ.get('CRAFTCHAIN_BACKUP_INTERVAL') else None
+app.config['BACKUP_STEP_PAGES'] = 1024
+app.config['BACKUP_STEP_SLEEP'] = 0.05  # seconds
+app.config['BACKUP_COMPRESSION'] = 'gzip'  # 'gzip', 'zstd' (needs zstandard) or None
+app.config['BACKUP_KEEP_LAST'] = 7
+app.config['BACKUP_KEEP_DAYS'] = None  # also keep anything younger than this
+app.config['BACKUP_VERIFY'] = True
+# Per-endpoint latency/SQL/upload metrics, scraped from /metrics (per process)
+app.config['METRICS_ENABLED'] = os.environ.get('CRAFTCHAIN_METRICS', '1') != '0'
+app.config['METRICS_LATENCY_BUCKETS'] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+app.config['METRICS_SQL_BUCKETS'] = (0, 1, 2, 5, 10, 20, 50, 100)  # statements per request
+app.config['METRICS_SLOW_REQUEST_SECONDS'] = 1.0  # log slower requests; None disables
 
 db = SQLAlchemy(app)
 
-# Set pragmatic SQLite options to reduce locking during writes
+# Set pragmatic SQLite options to reduce locking during writes. Except for
+# journal_mode, SQLite forgets these when a connection closes, so they are
+# applied to every connection the pool opens rather than once at startup.
+def sqlite_pragma_statements(profile: dict) -> list:
+    """PRAGMA statements for a SQLITE_PRAGMAS-style profile."""
+    statements = []
+    for name, value in profile.items():
+        if name == 'cache_size_kib':
+            name, value = 'cache_size', -int(value)  # negative cache_size means KiB
+        statements.append(f'PRAGMA {name}={value}')
+    return statements
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """Connect-event hook: apply SQLITE_PRAGMAS to a new connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in sqlite_pragma_statements(app.config['SQLITE_PRAGMAS']):
+            cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+SQLITE_REPORTED_PRAGMAS = (
+    'journal_mode', 'synchronous', 'foreign_keys', 'busy_timeout', 'temp_store',
+    'cache_size', 'mmap_size', 'wal_autocheckpoint', 'page_size',
+)
+# SQLite reports these as numbers
+SQLITE_PRAGMA_NAMES = {
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'foreign_keys': ('OFF', 'ON'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+
+
+def sqlite_settings() -> dict:
+    """Effective pragma values on a pooled connection (SQLite may cap mmap_size)."""
+    with db.engine.connect() as conn:
+        settings = {name: conn.execute(text(f'PRAGMA {name}')).scalar() for name in SQLITE_REPORTED_PRAGMAS}
+    for name, labels in SQLITE_PRAGMA_NAMES.items():
+        settings[name] = labels[settings[name]]
+    if settings['cache_size'] < 0:
+        settings['cache_size_kib'] = -settings.pop('cache_size')
+    else:
+        settings['cache_size_kib'] = settings.pop('cache_size') * settings['page_size'] // 1024
+    return settings
+
+
 def configure_sqlite():
     """Configure SQLite for better concurrency and reduced locking."""
+    event.listen(db.engine, 'connect', apply_sqlite_pragmas)
     try:
-        from sqlalchemy import text
         with db.engine.connect() as conn:
-            # Enable WAL journal mode (better concurrency)
+            # Lets maintenance return free pages in small steps. Only takes
+            # effect on a new database or after `flask maintenance --vacuum`
+            conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            # Enable WAL journal mode (better concurrency); stored in the file
             conn.execute(text("PRAGMA journal_mode=WAL"))
-            # Set busy timeout to 30 seconds
-            conn.execute(text("PRAGMA busy_timeout=30000"))
-            # Enable foreign key constraints
-            conn.execute(text("PRAGMA foreign_keys=ON"))
-            # Optimize for better performance
-            conn.execute(text("PRAGMA synchronous=NORMAL"))
-            conn.execute(text("PRAGMA cache_size=10000"))
-            conn.execute(text("PRAGMA temp_store=MEMORY"))
             conn.commit()
     except Exception as e:
         print(f"Warning: Could not configure SQLite: {e}")
@@ -81,6 +321,12 @@ with app.app_context():
 # -----------------------------------------------------------------------------
 class User(db.Model):
     __tablename__ = 'users'
+    # Lookups by email (login, registration, seller checks) are served by the
+    # unique constraint's index; this one backs the admin user listing.
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at'),
+        db.Index('ix_users_govt_id_path', 'govt_id_path'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     fullname = db.Column(db.String(120), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -97,6 +343,16 @@ class User(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    # One index per listing access path, each ending in the (created_at, id)
+    # keyset so filtered listings are returned in order without a sort step.
+    __table_args__ = (
+        db.Index('ix_products_created_at_id', 'created_at', 'id'),
+        db.Index('ix_products_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_products_status_category_created_at', 'status', 'category', 'created_at', 'id'),
+        db.Index('ix_products_category_created_at', 'category', 'created_at', 'id'),
+        db.Index('ix_products_seller_created_at', 'seller_id', 'created_at', 'id'),
+        db.Index('ix_products_image_path', 'image_path'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     seller_name = db.Column(db.String(120), nullable=False)
@@ -107,51 +363,1695 @@ class Product(db.Model):
     category = db.Column(db.String(40))  # e.g., 'pots', 'wood', 'metal'
     status = db.Column(db.String(20), default='pending')  # 'pending' | 'approved' | 'rejected'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Comma-separated widths of rendered derivatives; NULL until they exist
+    thumbnail_widths = db.Column(db.String(40))
+
+
+class CatalogState(db.Model):
+    """Single-row change counter, bumped by triggers on every products write.
+
+    Because the triggers live in the database, writes from the CLI, other
+    processes or external tools move the version just like API writes do.
+    """
+    __tablename__ = 'catalog_state'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
 
-def hash_password(plain: str) -> bytes:
-    return bcrypt.hashpw(plain.encode('utf-8'), bcrypt.gensalt())
+class PasswordPoolSaturated(Exception):
+    """Raised when the password pool already has its maximum queue depth."""
+
+
+class PasswordPool:
+    """Bounded thread pool for bcrypt work.
+
+    bcrypt releases the GIL, so a few threads hash in parallel while request
+    threads wait without holding it. Capping workers and queued jobs keeps a
+    burst of logins from taking every core away from catalog reads.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolSaturated()
+        try:
+            # Created lazily so forked server workers each start their own threads
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+password_pool = PasswordPool(
+    workers=app.config['PASSWORD_POOL_WORKERS'],
+    max_pending=app.config['PASSWORD_POOL_MAX_PENDING'],
+)
+
+
+def hash_password(plain: str, rounds: int | None = None) -> bytes:
+    salt = bcrypt.gensalt(rounds or app.config['BCRYPT_ROUNDS'])
+    return password_pool.run(bcrypt.hashpw, plain.encode('utf-8'), salt)
 
 
 def check_password(plain: str, hashed: bytes) -> bool:
-    return bcrypt.checkpw(plain.encode('utf-8'), hashed)
+    return password_pool.run(bcrypt.checkpw, plain.encode('utf-8'), hashed)
+
+
+class WriteQueueTimeout(Exception):
+    """Raised when a write isn't committed within WRITE_QUEUE_TIMEOUT.
+
+    committing is False if the job was withdrawn before it ran (nothing was
+    written, so retrying is safe) and True if it had already started and may
+    still commit.
+    """
+
+    def __init__(self, committing: bool):
+        self.committing = committing
+        super().__init__('write still committing' if committing else 'write queue timed out; nothing was written')
+
+
+class WriteQueue:
+    """Single-writer committer for SQLite.
+
+    Request threads submit a function that receives a Session and performs
+    their mutation; a dedicated thread runs queued jobs back to back inside
+    one BEGIN IMMEDIATE transaction (each job in its own SAVEPOINT, so one
+    failing job doesn't sink the rest) and commits once for the whole batch.
+    "database is locked" is retried here with backoff instead of surfacing
+    to users, and only one connection in this process ever writes.
+    """
+
+    def __init__(self, max_batch: int, max_retries: int, timeout: float):
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self.batches = 0
+        self.jobs = 0
+        self.lock_retries = 0
+        self.lock_failures = 0
+        self.largest_batch = 0
+
+    def _start(self):
+        # (Re)started lazily per process, so forked workers get their own thread
+        engine = create_engine(
+            app.config['SQLALCHEMY_DATABASE_URI'],
+            connect_args={'timeout': 30, 'check_same_thread': False},
+        )
+
+        @event.listens_for(engine, 'connect')
+        def _connect(dbapi_connection, connection_record):
+            # Let SQLAlchemy own transaction boundaries so SAVEPOINTs work
+            dbapi_connection.isolation_level = None
+            apply_sqlite_pragmas(dbapi_connection)
+
+        @event.listens_for(engine, 'begin')
+        def _begin(conn):
+            # Take the write lock up front instead of failing mid-transaction
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+        metrics.instrument(engine)
+        self._engine = engine
+        self._queue = queue.Queue()
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='write-queue', daemon=True).start()
+
+    def submit(self, fn):
+        """Run fn(session) in the committer and return its result once committed."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+        future = Future()
+        self._queue.put((fn, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Withdraw the job so it can't commit behind the caller's back
+            if future.cancel():
+                raise WriteQueueTimeout(committing=False) from None
+            if future.done():  # finished in the meantime
+                return future.result()
+            raise WriteQueueTimeout(committing=True) from None
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Skip jobs whose callers gave up; the rest can no longer be cancelled
+            jobs = [job for job in jobs if job[1].set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+            try:
+                self._commit(jobs)
+            except BaseException as e:  # never let the committer thread die
+                for _, future in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit(self, jobs):
+        for attempt in range(self.max_retries):
+            outcomes = []
+            try:
+                with Session(self._engine, expire_on_commit=False) as session, session.begin():
+                    for fn, _ in jobs:
+                        try:
+                            # Releasing the savepoint flushes, so constraint
+                            # errors surface here and stay with this job
+                            with session.begin_nested():
+                                value = fn(session)
+                            outcomes.append((True, value))
+                        except OperationalError as e:
+                            if 'locked' in str(e):
+                                raise
+                            outcomes.append((False, e))
+                        except Exception as e:
+                            outcomes.append((False, e))
+                break
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                if attempt == self.max_retries - 1:
+                    self.lock_failures += 1
+                    raise
+                self.lock_retries += 1
+                time.sleep(0.05 * (attempt + 1))  # Linear backoff
+        self.batches += 1
+        self.jobs += len(jobs)
+        self.largest_batch = max(self.largest_batch, len(jobs))
+        for (ok, value), (_, future) in zip(outcomes, jobs):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'jobs': self.jobs,
+            'lock_retries': self.lock_retries,
+            'lock_failures': self.lock_failures,
+            'largest_batch': self.largest_batch,
+        }
+
+
+write_queue = WriteQueue(
+    max_batch=app.config['WRITE_QUEUE_MAX_BATCH'],
+    max_retries=app.config['WRITE_QUEUE_MAX_RETRIES'],
+    timeout=app.config['WRITE_QUEUE_TIMEOUT'],
+)
+
+
+# Leading bytes of the file types uploads may have
+UPLOAD_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+)
+UPLOAD_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'application/pdf': '.pdf',
+}
+
+
+def sniff_content_type(head: bytes) -> str | None:
+    """Content type from a file's first bytes, or None if it isn't a known type."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in UPLOAD_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def upload_limit_message(max_bytes: int) -> str:
+    return f'File is larger than the {max_bytes / (1024 * 1024):g} MB limit'
+
+
+class UploadSpool:
+    """Temp file in the destination directory that hashes and sniffs as it's written.
+
+    Werkzeug writes each file part of a multipart body into one of these
+    (see AppRequest), so uploads never sit in memory, a file over max_bytes
+    or of a type outside allowed_types fails while it is still arriving, and
+    commit() only has to rename the file to its SHA-256. Uncommitted spools
+    are deleted when the request closes its files.
+    """
+
+    SNIFF_BYTES = 16
+
+    def __init__(self, dest_dir: str, max_bytes: int | None = None, allowed_types=None):
+        self.dest_dir = dest_dir
+        self.max_bytes = max_bytes
+        self.allowed_types = allowed_types
+        self.size = 0
+        self.content_type = None
+        self._head = b''
+        self._sniffed = False
+        self._digest = hashlib.sha256()
+        self._path = os.path.join(dest_dir, f'.{uuid.uuid4().hex}.tmp')
+        self._file = open(self._path, 'w+b')
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.close()
+            raise RequestEntityTooLarge(upload_limit_message(self.max_bytes))
+        if not self._sniffed:
+            self._head += data[:self.SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= self.SNIFF_BYTES:
+                self._sniff()
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def _sniff(self):
+        self._sniffed = True
+        self.content_type = sniff_content_type(self._head)
+        if self.allowed_types is not None and self.content_type not in self.allowed_types:
+            self.close()
+            allowed = ', '.join(sorted(UPLOAD_EXTENSIONS.get(t, t) for t in self.allowed_types))
+            raise UnsupportedMediaType(f'Unsupported file type (allowed: {allowed})')
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # Werkzeug rewinds each part once it's complete; check files shorter
+        # than SNIFF_BYTES then, while the form is still being parsed
+        if not self._sniffed:
+            self._sniff()
+        return self._file.seek(offset, whence)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def commit(self, ext: str = '') -> str:
+        """Move the file into place under its SHA-256; returns the web path.
+
+        The extension comes from the sniffed type when there is one, else ext.
+        """
+        if not self._sniffed:
+            self._sniff()
+        ext = UPLOAD_EXTENSIONS.get(self.content_type, ext.lower())
+        self._file.close()
+        path = os.path.join(self.dest_dir, f'{self._digest.hexdigest()}{ext}')
+        if os.path.exists(path):
+            os.utime(path)  # restart the GC grace period for the reused file
+        else:
+            os.replace(self._path, path)
+        self.close()
+        metrics.record_upload(os.path.basename(self.dest_dir), self.size)
+        return static_web_path(path)
+
+    def close(self):
+        self._file.close()
+        if self._path and os.path.exists(self._path):
+            os.remove(self._path)
+        self._path = None
 
 
 def save_file(file_storage, dest_dir) -> str:
+    """Store an upload under the SHA-256 of its content; identical files are kept once."""
     filename = secure_filename(file_storage.filename or '')
     if not filename:
         raise ValueError('Invalid file')
     root, ext = os.path.splitext(filename)
-    unique_name = f"{uuid.uuid4().hex}{ext}"
-    path = os.path.join(dest_dir, unique_name)
-    file_storage.save(path)
-    # Return web path relative to /static
+    stream = file_storage.stream
+    if isinstance(stream, UploadSpool) and stream.dest_dir == dest_dir:
+        return stream.commit(ext)  # already on disk and checked while it arrived
+    limits = app.config['UPLOAD_LIMITS'].get(os.path.basename(dest_dir), {})
+    return store_stream(stream, ext, dest_dir, limits.get('max_bytes'), limits.get('types'))
+
+
+def store_stream(stream, ext: str, dest_dir: str, max_bytes: int | None = None, allowed_types=None) -> str:
+    """Write a binary stream to dest_dir named by its SHA-256; returns the web path."""
+    spool = UploadSpool(dest_dir, max_bytes, allowed_types)
+    try:
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            spool.write(chunk)
+        return spool.commit(ext)
+    finally:
+        spool.close()
+
+
+def upload_ref_count(web_path: str) -> int:
+    """Number of rows that reference an uploaded file."""
+    products = db.session.query(func.count(Product.id)).filter(Product.image_path == web_path).scalar()
+    users = db.session.query(func.count(User.id)).filter(User.govt_id_path == web_path).scalar()
+    return products + users
+
+
+def remove_upload(path: str) -> int:
+    """Delete an uploaded file and its thumbnails; returns the bytes freed."""
+    victims = [path]
+    # Only product images have thumbnails; a govt ID with the same bytes shares the stem
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(PRODUCT_UPLOAD_DIR):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        victims += glob.glob(os.path.join(THUMBNAIL_DIR, f'{glob.escape(stem)}_*'))
+    freed = 0
+    for victim in victims:
+        try:
+            freed += os.path.getsize(victim)
+            os.remove(victim)
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+def release_uploads(*web_paths):
+    """Delete uploads that no row references any more (call after the commit)."""
+    grace = app.config['UPLOAD_GC_GRACE']
+    for web_path in set(filter(None, web_paths)):
+        if not web_path.startswith('/static/uploads/') or upload_ref_count(web_path):
+            continue
+        path = static_file_path(web_path)
+        try:
+            # A recent file may have just been re-uploaded; gc-uploads gets it later
+            if time.time() - os.path.getmtime(path) < grace:
+                continue
+        except OSError:
+            continue
+        remove_upload(path)
+
+
+def static_web_path(path: str) -> str:
+    """Web path (under /static) for a file inside STATIC_DIR or UPLOAD_DIR."""
+    path = os.path.abspath(path)
+    if os.path.commonpath([path, UPLOAD_DIR]) == UPLOAD_DIR:
+        return f"/static/uploads/{os.path.relpath(path, UPLOAD_DIR).replace(os.sep, '/')}"
     rel_path = os.path.relpath(path, STATIC_DIR)
     return f"/static/{rel_path.replace(os.sep, '/')}"
 
 
+def static_file_path(web_path: str) -> str:
+    """Filesystem path for a /static/... web path."""
+    if web_path.startswith('/static/uploads/'):
+        return os.path.join(UPLOAD_DIR, *web_path[len('/static/uploads/'):].split('/'))
+    return os.path.join(STATIC_DIR, *web_path[len('/static/'):].split('/'))
+
+
+def thumbnail_file(image_path: str, width: int, ext: str) -> str:
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(THUMBNAIL_DIR, f'{stem}_{width}.{ext}')
+
+
+def generate_thumbnails(image_path: str, force: bool = False) -> list[int]:
+    """Render WebP and JPEG derivatives of a product image; returns the widths.
+
+    Derivatives already on disk (from an identical upload) are reused unless force is set.
+    """
+    max_width = max(app.config['THUMBNAIL_WIDTHS'])
+    with Image.open(static_file_path(image_path)) as img:
+        # Let the JPEG decoder downscale while decoding; much cheaper for big photos
+        img.draft('RGB', (max_width, max_width))
+        img = ImageOps.exif_transpose(img)
+        widths = sorted({min(w, img.width) for w in app.config['THUMBNAIL_WIDTHS']})
+        for width in widths:
+            if not force and all(os.path.exists(thumbnail_file(image_path, width, ext)) for ext in ('webp', 'jpg')):
+                continue
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            has_alpha = resized.mode in ('RGBA', 'LA', 'P')
+            for ext, fmt, frame, options in (
+                ('webp', 'WEBP', resized.convert('RGBA' if has_alpha else 'RGB'),
+                 {'quality': app.config['THUMBNAIL_WEBP_QUALITY'], 'method': 4}),
+                ('jpg', 'JPEG', resized.convert('RGB'),
+                 {'quality': app.config['THUMBNAIL_JPEG_QUALITY'], 'optimize': True, 'progressive': True}),
+            ):
+                dest = thumbnail_file(image_path, width, ext)
+                tmp = f'{dest}.{uuid.uuid4().hex}.tmp'
+                frame.save(tmp, fmt, **options)
+                os.replace(tmp, dest)  # readers never see a half-written file
+    return widths
+
+
+def record_thumbnails(product_id: int, image_path: str, widths: list[int]):
+    def apply(session):
+        product = session.get(Product, product_id)
+        # Skip if the image was replaced while its derivatives were rendering
+        if product is None or product.image_path != image_path:
+            return None
+        product.thumbnail_widths = ','.join(str(w) for w in widths)
+        return product.status, product.category
+
+    result = write_queue.submit(apply)
+    if result and result[0] == 'approved':
+        catalog_cache.invalidate(result[1])
+
+
+class ThumbnailWorker:
+    """Background thread that renders image derivatives off the request path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self.generated = 0
+        self.failed = 0
+
+    def enqueue(self, product_id: int, image_path: str):
+        if Image is None:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='thumbnails', daemon=True).start()
+        self._queue.put((product_id, image_path))
+
+    def _run(self):
+        while True:
+            product_id, image_path = self._queue.get()
+            try:
+                record_thumbnails(product_id, image_path, generate_thumbnails(image_path))
+                self.generated += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Warning: Could not render thumbnails for {image_path}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'enabled': Image is not None,
+            'pending': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'generated': self.generated,
+            'failed': self.failed,
+        }
+
+
+thumbnail_worker = ThumbnailWorker()
+
+
+THUMBNAIL_WEB_DIR = static_web_path(THUMBNAIL_DIR)
+
+
+def product_image_variants(image_path: str, thumbnail_widths: str | None) -> tuple[str | None, str | None]:
+    """(thumbnail_url, srcset) for a product, or (None, None) until rendered."""
+    if not thumbnail_widths:
+        return None, None
+    # Same names as thumbnail_file(), built as URLs without touching os.path
+    prefix = f"{THUMBNAIL_WEB_DIR}/{image_path.rsplit('/', 1)[-1].rsplit('.', 1)[0]}_"
+    widths = thumbnail_widths.split(',')
+    srcset = ', '.join(f'{prefix}{w}.webp {w}w' for w in widths)
+    return f'{prefix}{widths[0]}.jpg', srcset
+
+
+# Columns a product payload is built from. Routes select them as plain tuples
+# (Core select: no ORM objects, no identity map) and serialize in one pass.
+PRODUCT_COLUMNS = (
+    Product.id, Product.seller_id, Product.seller_name, Product.name, Product.price,
+    Product.description, Product.image_path, Product.thumbnail_widths, Product.category,
+    Product.status, Product.created_at,
+)
+
+
+def product_select():
+    return db.select(*PRODUCT_COLUMNS)
+
+
+def serialize_products(rows) -> list[dict]:
+    """API dicts for PRODUCT_COLUMNS rows; created_at is left to dumps_json."""
+    items = []
+    append = items.append
+    for (product_id, seller_id, seller_name, name, price, description, image_path,
+         thumbnail_widths, category, status, created_at) in rows:
+        thumbnail_url, srcset = product_image_variants(image_path, thumbnail_widths)
+        append({
+            'id': product_id,
+            'seller_id': seller_id,
+            'seller_name': seller_name,
+            'name': name,
+            'price': price,
+            'description': description,
+            'image_url': image_path,
+            'thumbnail_url': thumbnail_url,
+            'srcset': srcset,
+            'category': category,
+            'status': status,
+            'created_at': created_at,
+        })
+    return items
+
+
+# Columns of the admin user listing; password hashes never leave the database
+USER_COLUMNS = (
+    User.id, User.fullname, User.email, User.role, User.phone, User.address, User.created_at,
+)
+
+
+def serialize_users(rows) -> list[dict]:
+    return [
+        {
+            'id': user_id,
+            'fullname': fullname,
+            'email': email,
+            'role': role,
+            'phone': phone,
+            'address': address,
+            'created_at': created_at,
+        }
+        for user_id, fullname, email, role, phone, address, created_at in rows
+    ]
+
+
+def dumps_json(payload) -> str:
+    """Compact JSON body; datetimes are written as isoformat() strings."""
+    if orjson is not None:
+        return orjson.dumps(payload).decode('utf-8')
+    return json.dumps(payload, separators=(',', ':'), default=datetime.isoformat)
+
+
+def encode_cursor(created_at: datetime, product_id: int) -> str:
+    """Opaque pagination cursor for the (created_at, id) keyset."""
+    raw = json.dumps([created_at.isoformat(), product_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, product_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(product_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+class CatalogCache:
+    """LRU of serialized approved-catalog listings with versioned invalidation.
+
+    Each category has a version counter that writes bump after committing.
+    An entry remembers the version it was built from, so a listing rendered
+    from data read before a concurrent write is never served afterwards.
+    Entries for the all-categories listing depend on every category.
+
+    Those counters only see this process's writes, so a lookup also passes
+    the current catalog_state ETag (shared by every worker and bumped by
+    triggers on each product change) and entries built under another ETag
+    are misses.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (version, expires_at, body, etag, last_modified)
+        self._versions = {}
+        self._epoch = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _version(self, category):
+        return (self._epoch, self._versions.get(category, 0))
+
+    def lookup(self, key, etag: str) -> tuple[str | None, tuple]:
+        """Return (body or None, version for put()) for the catalog at etag."""
+        category = key[0]
+        with self._lock:
+            version = self._version(category)
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[3] == etag and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2], version
+            self.misses += 1
+            return None, version
+
+    def put(self, key, body: str, version: tuple, etag: str, last_modified: datetime):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version(key[0]):
+                return  # a write landed while this listing was being built
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= len(old[2])
+            self._entries[key] = (version, time.monotonic() + self.ttl, body, etag, last_modified)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[2])
+                self.evictions += 1
+
+    def invalidate(self, *categories):
+        """Invalidate listings for the given categories, or everything if none."""
+        with self._lock:
+            self.invalidations += 1
+            if not categories:
+                self._epoch += 1
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for category in {*categories, None}:
+                self._versions[category] = self._versions.get(category, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+catalog_cache = CatalogCache(
+    max_entries=app.config['CATALOG_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['CATALOG_CACHE_MAX_BYTES'],
+    ttl=app.config['CATALOG_CACHE_TTL'],
+)
+
+
+def json_response(body: str):
+    """Response for an already-serialized JSON body (matches jsonify output)."""
+    return app.response_class(body + '\n', mimetype='application/json')
+
+
+def ndjson_response(query, serialize):
+    """Stream a select as newline-delimited JSON, STREAM_BATCH_SIZE rows at a time.
+
+    Only one batch is held in memory and the first line goes out as soon as
+    the first batch is fetched, however large the listing is.
+    """
+    batch_size = app.config['STREAM_BATCH_SIZE']
+
+    def generate():
+        result = db.session.execute(query.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield ''.join(dumps_json(item) + '\n' for item in serialize(rows))
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def get_catalog_state() -> tuple[str, datetime] | tuple[None, None]:
+    """Current (etag, last_modified) of the catalog, read with one PK lookup."""
+    row = db.session.execute(
+        db.select(CatalogState.version, CatalogState.updated_at).filter_by(id=1)
+    ).first()
+    if row is None:
+        return None, None
+    return f'catalog-{row.version}', row.updated_at
+
+
+def not_modified(etag: str | None, last_modified: datetime | None):
+    """304 response when the client's copy is still current, else None."""
+    if etag is None:
+        return None
+    if request.if_none_match:
+        if not request.if_none_match.contains(etag):
+            return None
+    elif not request.if_modified_since or (
+        last_modified.replace(microsecond=0, tzinfo=timezone.utc) > request.if_modified_since
+    ):
+        return None
+    return with_validators(app.response_class(status=304), etag, last_modified)
+
+
+def with_validators(response, etag: str | None, last_modified: datetime | None):
+    if etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # Always revalidate; a 304 is cheap and avoids heuristic staleness
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def product_listing_query(status: str | None = None, category: str | None = None):
+    """Newest-first product select shared by the listing routes."""
+    query = product_select()
+    if status:
+        query = query.where(Product.status == status)
+    if category:
+        query = query.where(Product.category == category)
+    return query.order_by(Product.created_at.desc(), Product.id.desc())
+
+
+def seller_products_query(seller_id: int):
+    return product_select().where(Product.seller_id == seller_id).order_by(Product.created_at.desc(), Product.id.desc())
+
+
+# Full-text search runs against an external-content FTS5 table that triggers
+# keep in sync with products, so every write path updates it.
+products_fts = table('products_fts', column('rowid'))
+SEARCH_COLUMNS = ('name', 'description', 'seller_name', 'category')
+# bm25() weight per SEARCH_COLUMNS entry: a hit in the name counts the most
+SEARCH_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+
+
+def fts_match_expression(q: str) -> str | None:
+    """Safe FTS5 query for free text: all words must match, the last as a prefix."""
+    terms = re.findall(r'\w+', q.lower())
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+@lru_cache(maxsize=4)
+def _serializer_for(secret_key: str) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(secret_key, salt='admin-auth')
+
+
 def get_serializer():
-    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='admin-auth')
+    return _serializer_for(app.config['SECRET_KEY'])
+
+
+class TokenCache:
+    """LRU of verified token claims, so a repeated token skips the HMAC check.
+
+    Keyed by the token's SHA-256 digest so raw tokens are not kept in memory.
+    Entries live for at most `ttl` seconds and never past the token's expiry.
+    Claims are only cached once the user is known to still hold the token's
+    role, so a hit needs no database query; role changes made in this process
+    drop the user's entries at once, other processes notice within `ttl`.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (claims, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token: str) -> tuple[int, str] | None:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: tuple[int, str], expires_at: float):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, min(expires_at, time.time() + self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, user_id: int):
+        """Forget every cached token of a user whose role changed or who was deleted."""
+        with self._lock:
+            for key in [key for key, (claims, _) in self._entries.items() if claims[0] == user_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+token_cache = TokenCache(app.config['AUTH_TOKEN_CACHE_SIZE'], app.config['AUTH_TOKEN_CACHE_TTL'])
+
+
+def generate_token(user_id: int, role: str) -> str:
+    s = get_serializer()
+    return s.dumps({'uid': user_id, 'role': role})
 
 
 def generate_admin_token(user_id: int) -> str:
-    s = get_serializer()
-    return s.dumps({'uid': user_id, 'role': 'admin'})
+    return generate_token(user_id, 'admin')
 
 
-def verify_admin_token(token: str) -> int | None:
+def verify_token(token: str) -> tuple[int, str] | None:
+    """(uid, role) carried by a valid login token, else None."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
     s = get_serializer()
+    max_age = app.config['AUTH_TOKEN_MAX_AGE']
     try:
-        data = s.loads(token, max_age=60 * 60 * 8)  # 8 hours
-        if data.get('role') == 'admin' and 'uid' in data:
-            return int(data['uid'])
-        return None
+        data, issued_at = s.loads(token, max_age=max_age, return_timestamp=True)
     except (BadSignature, SignatureExpired):
         return None
+    if not isinstance(data, dict) or 'uid' not in data or 'role' not in data:
+        return None
+    claims = (int(data['uid']), data['role'])
+    # The role was signed at login; make sure an admin hasn't changed it since
+    if db.session.scalar(db.select(User.role).filter_by(id=claims[0])) != claims[1]:
+        return None
+    token_cache.put(token, claims, issued_at.timestamp() + max_age)
+    return claims
+
+
+def verify_admin_token(token: str) -> int | None:
+    claims = verify_token(token)
+    if claims and claims[1] == 'admin':
+        return claims[0]
+    return None
+
+
+def bearer_token() -> str | None:
+    auth = request.headers.get('Authorization', '')
+    return auth[len('Bearer '):] if auth.startswith('Bearer ') else None
+
+
+class AuthTimings:
+    """Per-endpoint count, failures and latency of the admin auth check."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}  # endpoint -> [calls, failures, total_seconds, max_seconds]
+
+    def record(self, endpoint: str, elapsed: float, ok: bool):
+        with self._lock:
+            route = self._routes.setdefault(endpoint, [0, 0, 0.0, 0.0])
+            route[0] += 1
+            route[1] += not ok
+            route[2] += elapsed
+            route[3] = max(route[3], elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {
+                    'calls': calls,
+                    'failures': failures,
+                    'avg_us': round(total / calls * 1e6, 1),
+                    'max_us': round(peak * 1e6, 1),
+                }
+                for endpoint, (calls, failures, total, peak) in self._routes.items()
+            }
+
+
+auth_timings = AuthTimings()
+
+
+def authorize_admin() -> int | None:
+    """Admin id from the request's Bearer / X-Admin-Token header, else None."""
+    started = time.perf_counter()
+    token = bearer_token() or request.headers.get('X-Admin-Token')
+    admin_id = verify_admin_token(token) if token else None
+    auth_timings.record(request.endpoint, time.perf_counter() - started, admin_id is not None)
+    return admin_id
+
+
+def admin_required(view):
+    """Reject the request with 401 unless it carries a valid admin token (id in g.admin_id)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.admin_id = authorize_admin()
+        if not g.admin_id:
+            return jsonify({'error': 'Admin authorization required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def authenticate_seller():
+    """(seller_id, None) for the calling seller, or (None, error response).
+
+    Sellers send their login token as a Bearer token; a cached token needs
+    no database lookup (see TokenCache).
+    """
+    token = bearer_token()
+    if not token:
+        return None, (jsonify({'error': 'Seller authorization required'}), 401)
+    claims = verify_token(token)
+    if claims is None:
+        return None, (jsonify({'error': 'Invalid or expired token'}), 401)
+    if claims[1] != 'seller':
+        return None, (jsonify({'error': 'Seller authorization required'}), 403)
+    return claims[0], None
+
+
+# -----------------------------------------------------------------------------
+# Bulk product import (API and CLI)
+# -----------------------------------------------------------------------------
+def manifest_format(fmt: str | None, filename: str) -> str | None:
+    """'csv' or 'jsonl' from an explicit format or the manifest's extension."""
+    fmt = (fmt or os.path.splitext(filename)[1].lstrip('.')).lower()
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(fmt)
+
+
+def read_manifest(stream, fmt: str):
+    """Yield (line number, row dict or None) from a manifest, one row at a time."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_num, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_num, row if isinstance(row, dict) else None
+
+
+def validate_import_row(row: dict | None) -> tuple[dict | None, str | None]:
+    """(product fields, None) for a valid manifest row, else (None, error)."""
+    if row is None:
+        return None, 'Row is not a JSON object'
+    def field(name):
+        value = row.get(name)
+        return str(value).strip() if value is not None else ''
+    name = field('product_name') or field('name')
+    if not name:
+        return None, 'Missing field: product_name'
+    try:
+        price = float(field('price'))
+    except ValueError:
+        return None, 'Invalid price'
+    if price <= 0:
+        return None, 'Price must be greater than 0'
+    description = field('description')
+    if not description:
+        return None, 'Missing field: description'
+    category = field('category').lower()
+    if category not in {'pots', 'wood', 'metal'}:
+        return None, 'Invalid category. Must be one of pots, wood, metal'
+    image = field('image')
+    if not image:
+        return None, 'Missing field: image'
+    return {
+        'name': name,
+        'price': price,
+        'description': description,
+        'category': category,
+        'image': image,
+        'seller_name': field('seller_name'),
+    }, None
+
+
+def import_products(seller_id: int, seller_name: str, manifest, images: zipfile.ZipFile,
+                    batch_size: int, workers: int, render_thumbnails: bool = True) -> dict:
+    """Validate manifest rows as they stream in and insert them in batches.
+
+    Each batch's images are copied out of the zip into content-addressed
+    storage by a thread pool, then the batch is inserted with one
+    executemany in a single write-queue transaction. Products start as
+    pending, like create_product. Returns counts plus per-row errors.
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+    limits = app.config['UPLOAD_LIMITS']['products']
+
+    def fail(line_num, error):
+        report['failed'] += 1
+        report['errors'].append({'row': line_num, 'error': error})
+
+    def store_image(item):
+        line_num, fields = item
+        try:
+            info = images.getinfo(fields['image'])
+        except KeyError:
+            return line_num, fields, None, f"Image not found in archive: {fields['image']}"
+        if info.file_size > limits['max_bytes']:
+            return line_num, fields, None, 'Image is too large'
+        ext = os.path.splitext(secure_filename(os.path.basename(info.filename)))[1].lower()
+        try:
+            with images.open(info) as member:
+                path = store_stream(member, ext, PRODUCT_UPLOAD_DIR, limits['max_bytes'], limits['types'])
+                return line_num, fields, path, None
+        except (RequestEntityTooLarge, UnsupportedMediaType) as e:
+            return line_num, fields, None, e.description
+        except (OSError, zipfile.BadZipFile) as e:
+            return line_num, fields, None, f'Could not read image: {e}'
+
+    def flush(pool, batch):
+        rows, line_nums = [], []
+        for line_num, fields, image_path, error in pool.map(store_image, batch):
+            if error:
+                fail(line_num, error)
+                continue
+            rows.append({
+                'seller_id': seller_id,
+                'seller_name': fields['seller_name'] or seller_name,
+                'name': fields['name'],
+                'price': fields['price'],
+                'description': fields['description'],
+                'image_path': image_path,
+                'category': fields['category'],
+                'status': 'pending',
+            })
+            line_nums.append(line_num)
+        if not rows:
+            return
+        try:
+            ids = write_queue.submit(lambda session: session.scalars(
+                db.insert(Product).returning(Product.id, sort_by_parameter_order=True), rows
+            ).all())
+        except Exception as e:
+            for line_num in line_nums:
+                fail(line_num, f'Database error: {e}')
+            return
+        report['imported'] += len(ids)
+        if render_thumbnails:
+            for product_id, row in zip(ids, rows):
+                thumbnail_worker.enqueue(product_id, row['image_path'])
+
+    with ThreadPoolExecutor(workers) as pool:
+        batch = []
+        for line_num, row in manifest:
+            fields, error = validate_import_row(row)
+            if error:
+                fail(line_num, error)
+                continue
+            batch.append((line_num, fields))
+            if len(batch) >= batch_size:
+                flush(pool, batch)
+                batch = []
+        if batch:
+            flush(pool, batch)
+    return report
+
+
+# -----------------------------------------------------------------------------
+# Data export (CLI and admin endpoint)
+# -----------------------------------------------------------------------------
+# Credentials and payment data never leave the database
+EXPORT_EXCLUDED_COLUMNS = {'password_hash', 'payment_details'}
+EXPORT_TABLES = {'users': User, 'products': Product}
+
+
+def export_columns(table_name: str) -> list:
+    model = EXPORT_TABLES[table_name]
+    return [c for c in model.__table__.columns if c.name not in EXPORT_EXCLUDED_COLUMNS]
+
+
+def export_chunks(table_name: str, fmt: str, since_id: int = 0, since: datetime | None = None,
+                  state: dict | None = None):
+    """Yield a table as CSV or JSONL text, reading EXPORT_CHUNK_SIZE rows per query.
+
+    Rows come out in id order via `id > last id` keyset queries, so memory is
+    constant and the last exported id (kept in `state['last_id']`) is the
+    watermark to pass as since_id next time.
+    """
+    model = EXPORT_TABLES[table_name]
+    columns = export_columns(table_name)
+    names = [c.name for c in columns]
+    chunk_size = app.config['EXPORT_CHUNK_SIZE']
+    state = {} if state is None else state
+    state.update(rows=0, last_id=since_id)
+
+    if fmt == 'csv':
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(names)
+        yield out.getvalue()
+    while True:
+        query = db.select(*columns).where(model.id > state['last_id']).order_by(model.id).limit(chunk_size)
+        if since is not None:
+            query = query.where(model.created_at >= since)
+        rows = db.session.execute(query).all()
+        # End the read transaction between chunks so a long export never
+        # holds back WAL checkpoints
+        db.session.rollback()
+        if not rows:
+            return
+        if fmt == 'csv':
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerows(rows)
+            yield out.getvalue()
+        else:
+            yield ''.join(dumps_json(dict(zip(names, row))) + '\n' for row in rows)
+        state['rows'] += len(rows)
+        state['last_id'] = rows[-1][0]
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# -----------------------------------------------------------------------------
+# Synthetic data for profiling and capacity planning (flask seed)
+# -----------------------------------------------------------------------------
+SEED_CATEGORY_WEIGHTS = {'pots': 50, 'wood': 30, 'metal': 20}
+SEED_STATUS_WEIGHTS = {'approved': 70, 'pending': 25, 'rejected': 5}
+SEED_ITEMS = {
+    'pots': ['Terracotta planter', 'Clay water pot', 'Glazed vase', 'Tea cup set', 'Diya set'],
+    'wood': ['Carved elephant', 'Teak jewelry box', 'Rosewood bowl', 'Sandalwood comb', 'Channapatna toy'],
+    'metal': ['Brass lamp', 'Bidri vase', 'Copper bottle', 'Bell metal plate', 'Dhokra figurine'],
+}
+SEED_STYLES = ['Handmade', 'Hand-painted', 'Rustic', 'Traditional', 'Antique-finish', 'Miniature']
+SEED_PALETTE = {'pots': (181, 101, 29), 'wood': (133, 94, 66), 'metal': (184, 134, 11)}
+
+
+def placeholder_images(per_category: int, rng: random.Random) -> dict[str, list[str]]:
+    """Web paths of placeholder product images per category (content-addressed, so reruns reuse them)."""
+    images = {}
+    for category, base_color in SEED_PALETTE.items():
+        paths = []
+        for _ in range(per_category):
+            if Image is not None:
+                shade = rng.randint(-40, 40)
+                color = tuple(max(0, min(255, c + shade)) for c in base_color)
+                buf = io.BytesIO()
+                Image.new('RGB', (800, 600), color).save(buf, 'JPEG', quality=80)
+                buf.seek(0)
+                paths.append(store_stream(buf, '.jpg', PRODUCT_UPLOAD_DIR))
+            else:
+                # Without Pillow, fall back to the shipped category photos
+                photo = {'pots': 'pottery.jpg', 'wood': 'wodden.jpg', 'metal': 'metal.jpg'}[category]
+                with open(os.path.join(PICS_DIR, photo), 'rb') as f:
+                    paths.append(store_stream(f, '.jpg', PRODUCT_UPLOAD_DIR))
+                break
+        images[category] = paths
+    return images
+
+
+def seed_database(users: int, products: int, password: str, rounds: int = 4, sellers: int | None = None,
+                  batch_size: int = 10000, images_per_category: int = 8, rng: random.Random | None = None,
+                  progress=None) -> dict:
+    """Insert synthetic users and products in batched write-queue transactions.
+
+    Every user shares one password hash computed once at a low bcrypt cost
+    (logins still work; the cost is stored in the hash). Product ownership
+    follows a Zipf-like skew so a few sellers have most of the catalog, and
+    categories/statuses follow SEED_*_WEIGHTS.
+    """
+    rng = rng or random.Random()
+    sellers = min(users, sellers if sellers is not None else max(1, users // 10))
+    if products and not sellers:
+        raise ValueError('Products need at least one seller')
+    password_hash = hash_password(password, rounds=rounds)
+    now = datetime.utcnow()
+    year = 365 * 24 * 3600
+    first_id = (db.session.scalar(db.select(func.max(User.id))) or 0) + 1
+    db.session.rollback()
+
+    def insert(model, rows):
+        # RETURNING makes SQLAlchemy batch the rows into multi-row INSERTs
+        # ("insertmanyvalues"). A statement that fires a trigger inside the
+        # job's SAVEPOINT opens a statement journal costing more the larger the
+        # database, so one statement per row slows down as the table grows.
+        write_queue.submit(lambda session: session.execute(db.insert(model).returning(model.id), rows).all())
+
+    batch = []
+    for i in range(users):
+        role = 'seller' if i < sellers else 'buyer'
+        n = first_id + i
+        batch.append({
+            'fullname': f'{role.title()} {n}',
+            'email': f'{role}{n}@seed.craftchain.local',
+            'phone': f'9{rng.randrange(10 ** 9):09d}',
+            'address': rng.choice(['Kumta', 'Mysuru', 'Jaipur', 'Moradabad', 'Channapatna', 'Bidar']),
+            'role': role,
+            'password_hash': password_hash,
+            'created_at': now - timedelta(seconds=rng.random() * year),
+        })
+        if len(batch) >= batch_size:
+            insert(User, batch)
+            batch = []
+            if progress:
+                progress('users', i + 1)
+    if batch:
+        insert(User, batch)
+        if progress:
+            progress('users', users)
+
+    seller_rows = db.session.execute(
+        db.select(User.id, User.fullname).where(User.id >= first_id, User.role == 'seller').order_by(User.id)
+    ).all()
+    db.session.rollback()
+    images = placeholder_images(images_per_category, rng) if products else {}
+    if products:
+        # The per-row FTS trigger costs several times the insert itself; drop it
+        # for the load and rebuild the index once at the end. The catalog_state
+        # trigger stays: servers sharing the database rely on it to see their
+        # own inserts during the seed
+        write_queue.submit(lambda session: session.execute(text('DROP TRIGGER IF EXISTS trg_products_fts_insert')))
+    try:
+        _seed_products(products, batch_size, seller_rows, images, rng, now, insert, progress)
+    finally:
+        if products:
+            ensure_catalog_triggers()
+            ensure_search_index()
+            write_queue.submit(_reindex_after_bulk_load)
+    catalog_cache.invalidate()
+    return {'users': users, 'sellers': len(seller_rows), 'products': products}
+
+
+def _reindex_after_bulk_load(session):
+    """Rebuild products_fts after trigger-less inserts and bump catalog_state once."""
+    if session.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")).first():
+        session.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+    session.execute(text(
+        "UPDATE catalog_state SET version = version + 1, "
+        "updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = 1"
+    ))
+
+
+def _seed_products(products, batch_size, seller_rows, images, rng, now, insert, progress):
+    year = 365 * 24 * 3600
+    # Zipf-like: the k-th seller gets about 1/k^1.1 of the top seller's products
+    seller_weights = list(itertools.accumulate(1 / (k + 1) ** 1.1 for k in range(len(seller_rows))))
+    categories, category_weights = zip(*SEED_CATEGORY_WEIGHTS.items())
+    statuses, status_weights = zip(*SEED_STATUS_WEIGHTS.items())
+
+    done = 0
+    while done < products:
+        n = min(batch_size, products - done)
+        # Draw a whole batch per choices() call; per-row calls re-sum the weights
+        owners = rng.choices(seller_rows, cum_weights=seller_weights, k=n)
+        batch = []
+        for (seller_id, seller_name), category, status in zip(
+            owners, rng.choices(categories, category_weights, k=n), rng.choices(statuses, status_weights, k=n)
+        ):
+            item = rng.choice(SEED_ITEMS[category])
+            batch.append({
+                'seller_id': seller_id,
+                'seller_name': seller_name,
+                'name': f'{rng.choice(SEED_STYLES)} {item.lower()}',
+                'price': round(rng.lognormvariate(6.5, 0.8), 2),
+                'description': f'{item} made by hand in a family workshop. Each piece is unique.',
+                'image_path': rng.choice(images[category]),
+                'category': category,
+                'status': status,
+                'created_at': now - timedelta(seconds=rng.random() * year),
+            })
+        insert(Product, batch)
+        done += n
+        if progress:
+            progress('products', done)
+
+
+# -----------------------------------------------------------------------------
+# Background database maintenance (WAL checkpoints, statistics, free pages)
+# -----------------------------------------------------------------------------
+class MaintenanceScheduler:
+    """Background thread that keeps the SQLite file healthy while the app runs.
+
+    Every MAINTENANCE_INTERVAL it PASSIVE-checkpoints the WAL once the file
+    passes MAINTENANCE_WAL_CHECKPOINT_BYTES (this copies frames back without
+    blocking anyone) and, when traffic is low, truncates it and runs the due
+    periodic tasks (add_task). Its own connection waits at most
+    MAINTENANCE_BUSY_TIMEOUT for a lock, so it gives way to writers instead of
+    making them queue. With several worker processes, a lock file next to the
+    database elects the one that runs it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self._lock_file = None
+        self._data_version = None
+        self._last_activity = time.monotonic()
+        self._tasks = {}  # name -> [interval, fn(conn), last_run]
+        self.runs = {}
+        self.failures = {}
+        self.last_error = None
+
+    def add_task(self, name: str, interval: float, fn):
+        """Run fn(conn) at most every interval seconds, only while traffic is low."""
+        self._tasks[name] = [interval, fn, time.monotonic()]
+
+    def note_request(self):
+        self._last_activity = time.monotonic()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._conn = self._lock_file = None
+                threading.Thread(target=self._run, name='maintenance', daemon=True).start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={app.config['MAINTENANCE_BUSY_TIMEOUT']}")
+        return conn
+
+    def _elected(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        lock_file = open(f'{DB_PATH}.maintenance.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()  # another process runs maintenance
+            return False
+        self._lock_file = lock_file  # held until this process exits
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(app.config['MAINTENANCE_INTERVAL'])
+            if not app.config['MAINTENANCE_ENABLED'] or not self._elected():
+                continue
+            try:
+                if self._conn is None:
+                    self._conn = self.connect()
+                self.tick(self._conn)
+            except Exception as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+                print(f"Warning: Database maintenance failed: {e}")
+
+    def idle(self, conn) -> bool:
+        """No request in this process and no commit by anyone for MAINTENANCE_IDLE_SECONDS."""
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._last_activity = time.monotonic()
+        return time.monotonic() - self._last_activity >= app.config['MAINTENANCE_IDLE_SECONDS']
+
+    def _record(self, name: str, fn, *args):
+        try:
+            result = fn(*args)
+        except sqlite3.OperationalError as e:
+            # Typically "database is locked": traffic came back, try next time
+            self.failures[name] = self.failures.get(name, 0) + 1
+            self.last_error = f'{name}: {e}'
+            return None
+        self.runs[name] = self.runs.get(name, 0) + 1
+        return result
+
+    def tick(self, conn, force: bool = False):
+        """One maintenance pass; force runs everything now, busy or not."""
+        if force or wal_size() > app.config['MAINTENANCE_WAL_CHECKPOINT_BYTES']:
+            self._record('checkpoint_passive', checkpoint_wal, conn, 'PASSIVE')
+        if not force and not self.idle(conn):
+            return
+        if force or wal_size() > app.config['MAINTENANCE_WAL_CHECKPOINT_BYTES']:
+            self._record('checkpoint_truncate', checkpoint_wal, conn, 'TRUNCATE')
+        now = time.monotonic()
+        for name, task in self._tasks.items():
+            interval, fn, last_run = task
+            if force or now - last_run >= interval:
+                task[2] = now
+                self._record(name, fn, conn)
+
+    def stats(self) -> dict:
+        return {
+            'enabled': app.config['MAINTENANCE_ENABLED'],
+            'running_here': self._lock_file is not None,
+            'wal_bytes': wal_size(),
+            'runs': dict(self.runs),
+            'failures': dict(self.failures),
+            'last_error': self.last_error,
+        }
+
+
+def wal_size() -> int:
+    try:
+        return os.path.getsize(f'{DB_PATH}-wal')
+    except OSError:
+        return 0
+
+
+def checkpoint_wal(conn, mode: str = 'PASSIVE') -> tuple:
+    """PRAGMA wal_checkpoint; returns (busy, wal_frames, checkpointed_frames)."""
+    busy, log, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+    if busy and mode != 'PASSIVE':
+        raise sqlite3.OperationalError(f'{mode} checkpoint blocked by readers or a writer')
+    return busy, log, checkpointed
+
+
+def optimize_database(conn, full: bool = False):
+    """Refresh planner statistics: a bounded ANALYZE, else PRAGMA optimize."""
+    conn.execute(f"PRAGMA analysis_limit={app.config['MAINTENANCE_ANALYSIS_LIMIT']}")
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    conn.execute('ANALYZE' if full or not has_stats else 'PRAGMA optimize')
+
+
+def incremental_vacuum(conn, min_free_pages: int | None = None, should_stop=None) -> int:
+    """Return free pages to the filesystem in short steps; returns pages freed.
+
+    Needs auto_vacuum=INCREMENTAL (new databases, or after a full VACUUM).
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        return 0
+    step = app.config['MAINTENANCE_VACUUM_STEP_PAGES']
+    if min_free_pages is None:
+        min_free_pages = app.config['MAINTENANCE_VACUUM_MIN_FREE_PAGES']
+    freed = 0
+    free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    if free < min_free_pages:
+        return 0
+    while free:
+        conn.execute(f'PRAGMA incremental_vacuum({step})').fetchall()
+        remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        freed += free - remaining
+        if remaining == free or (should_stop and should_stop()):
+            break
+        free = remaining
+        time.sleep(0.01)  # let queued writers in between steps
+    return freed
+
+
+maintenance = MaintenanceScheduler()
+maintenance.add_task('optimize', app.config['MAINTENANCE_OPTIMIZE_INTERVAL'], optimize_database)
+maintenance.add_task('incremental_vacuum', app.config['MAINTENANCE_VACUUM_INTERVAL'], lambda conn: incremental_vacuum(
+    conn, should_stop=lambda: time.monotonic() - maintenance._last_activity < app.config['MAINTENANCE_IDLE_SECONDS'],
+))
+
+
+@app.before_request
+def note_request_for_maintenance():
+    if app.config['MAINTENANCE_ENABLED']:
+        maintenance.note_request()
+
+
+@app.cli.command('maintenance')
+@click.option('--analyze', is_flag=True, help='Full (bounded) ANALYZE instead of PRAGMA optimize.')
+@click.option('--vacuum', is_flag=True,
+              help='Full VACUUM: rebuilds the file and enables incremental vacuum. Blocks writers; run when quiet.')
+def maintenance_cmd(analyze, vacuum):
+    """Checkpoint and truncate the WAL, refresh statistics and free unused pages now."""
+    conn = maintenance.connect()
+    conn.execute('PRAGMA busy_timeout=30000')  # the CLI can afford to wait for a quiet moment
+    try:
+        before = wal_size()
+        busy, log, checkpointed = checkpoint_wal(conn, 'TRUNCATE')
+        click.echo(f'WAL checkpointed: {checkpointed}/{log} frames, {before} -> {wal_size()} bytes')
+        optimize_database(conn, full=analyze)
+        click.echo('Statistics refreshed' + (' (ANALYZE)' if analyze else ' (PRAGMA optimize)'))
+        if vacuum:
+            size = os.path.getsize(DB_PATH)
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+            checkpoint_wal(conn, 'TRUNCATE')
+            click.echo(f'VACUUM: {size} -> {os.path.getsize(DB_PATH)} bytes; incremental vacuum enabled')
+        else:
+            click.echo(f'Incremental vacuum freed {incremental_vacuum(conn, min_free_pages=1)} pages')
+    finally:
+        conn.close()
+
+
+# -----------------------------------------------------------------------------
+# Online backups (SQLite backup API)
+# -----------------------------------------------------------------------------
+BACKUP_PREFIX = 'craftchain-'
+BACKUP_EXTENSIONS = {None: '.db', 'gzip': '.db.gz', 'zstd': '.db.zst'}
+
+
+def backup_row_counts(conn) -> dict:
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return {name: conn.execute(f'SELECT count(*) FROM {name}').fetchone()[0] for name in EXPORT_TABLES if name in tables}
+
+
+def copy_database(dest_path: str, step_pages: int, step_sleep: float) -> tuple[int, dict]:
+    """Consistent copy of the live database via sqlite3's backup API; returns (pages, row counts).
+
+    The copy runs step_pages at a time, pausing step_sleep between steps.
+    The source connection holds one read transaction throughout, so in WAL
+    mode every step reads the same snapshot: other connections keep
+    committing without restarting the copy, and the row counts taken at the
+    start describe exactly what was copied.
+    """
+    source = sqlite3.connect(DB_PATH, isolation_level=None)
+    target = sqlite3.connect(dest_path)
+    try:
+        source.execute('BEGIN')
+        counts = backup_row_counts(source)
+        source.backup(target, pages=step_pages, progress=lambda status, remaining, total: time.sleep(step_sleep))
+        # A standalone file: no -wal/-shm next to it
+        target.execute('PRAGMA journal_mode=DELETE')
+        return target.execute('PRAGMA page_count').fetchone()[0], counts
+    finally:
+        target.close()
+        source.close()
+
+
+def compress_file(path: str, out_path: str, compression: str | None):
+    """Write path to out_path with the given compression (None just moves it)."""
+    if compression is None:
+        os.replace(path, out_path)
+        return
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstd compression needs the zstandard package')
+        out = zstandard.open(out_path, 'wb')
+    else:
+        out = gzip.open(out_path, 'wb', compresslevel=6)
+    with open(path, 'rb') as src, out as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.remove(path)
+
+
+def open_backup(path: str):
+    """Readable binary stream of a backup's database bytes, whatever its compression."""
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError('Reading .zst backups needs the zstandard package')
+        return zstandard.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def verify_backup(path: str, expected_counts: dict | None = None) -> dict:
+    """Restore a backup into a temp file and integrity-check it; returns its row counts.
+
+    Raises ValueError if the restored copy is damaged or its row counts differ
+    from expected_counts.
+    """
+    restored = os.path.join(os.path.dirname(path), f'.verify-{uuid.uuid4().hex}.db')
+    try:
+        with open_backup(path) as src, open(restored, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        conn = sqlite3.connect(restored)
+        try:
+            result = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+            if result != ['ok']:
+                raise ValueError(f"Integrity check failed: {'; '.join(result[:5])}")
+            counts = backup_row_counts(conn)
+        finally:
+            conn.close()
+    finally:
+        if os.path.exists(restored):
+            os.remove(restored)
+    if expected_counts is not None and counts != expected_counts:
+        raise ValueError(f'Row counts differ after restore: {counts} != {expected_counts}')
+    return counts
+
+
+def prune_backups(backup_dir: str, keep_last: int, keep_days: float | None = None) -> list:
+    """Delete backups beyond the newest keep_last that are also older than keep_days."""
+    backups = sorted(
+        (entry for entry in os.scandir(backup_dir)
+         if entry.is_file() and entry.name.startswith(BACKUP_PREFIX) and '.db' in entry.name),
+        key=lambda entry: entry.name, reverse=True,  # names sort by timestamp
+    )
+    cutoff = time.time() - keep_days * 86400 if keep_days is not None else None
+    removed = []
+    for entry in backups[keep_last:]:
+        if cutoff is None or entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed.append(entry.name)
+    return removed
+
+
+def backup_database(backup_dir: str | None = None, compression: str | None = 'default',
+                    verify: bool | None = None) -> dict:
+    """Take, verify, compress and prune one backup with the BACKUP_* settings."""
+    backup_dir = backup_dir or app.config['BACKUP_DIR']
+    compression = app.config['BACKUP_COMPRESSION'] if compression == 'default' else compression
+    verify = app.config['BACKUP_VERIFY'] if verify is None else verify
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.perf_counter()
+    # Microseconds keep two backups taken in the same second apart
+    name = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    path = os.path.join(backup_dir, name + BACKUP_EXTENSIONS[compression])
+    # Work in progress is dot-named (prune_backups skips it) and only renamed
+    # to path once compressed and verified
+    copy_path = os.path.join(backup_dir, f'.{name}.copy.db')
+    tmp_path = os.path.join(backup_dir, f'.{name}{BACKUP_EXTENSIONS[compression]}')
+    try:
+        pages, counts = copy_database(copy_path, app.config['BACKUP_STEP_PAGES'], app.config['BACKUP_STEP_SLEEP'])
+        compress_file(copy_path, tmp_path, compression)
+        if verify:
+            verify_backup(tmp_path, counts)
+        os.replace(tmp_path, path)
+    finally:
+        for leftover in (copy_path, tmp_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return {
+        'path': path,
+        'pages': pages,
+        'bytes': os.path.getsize(path),
+        'rows': counts,
+        'verified': verify,
+        'seconds': round(time.perf_counter() - started, 2),
+        'pruned': prune_backups(backup_dir, app.config['BACKUP_KEEP_LAST'], app.config['BACKUP_KEEP_DAYS']),
+    }
+
+
+if app.config['BACKUP_INTERVAL']:
+    maintenance.add_task('backup', app.config['BACKUP_INTERVAL'], lambda conn: backup_database())
+
+
+@app.cli.command('backup')
+@click.option('--dir', 'backup_dir', default=None, help='Default: BACKUP_DIR (backups/).')
+@click.option('--compression', type=click.Choice(['gzip', 'zstd', 'none']), default=None,
+              help='Default: BACKUP_COMPRESSION (gzip).')
+@click.option('--no-verify', is_flag=True, help='Skip the restore + integrity check.')
+@click.option('--keep-last', type=int, default=None, help='Backups to keep (default: BACKUP_KEEP_LAST).')
+@click.option('--keep-days', type=float, default=None, help='Also keep backups younger than this.')
+def backup_cmd(backup_dir, compression, no_verify, keep_last, keep_days):
+    """Back up the live database without stopping the site."""
+    if keep_last is not None:
+        app.config['BACKUP_KEEP_LAST'] = keep_last
+    if keep_days is not None:
+        app.config['BACKUP_KEEP_DAYS'] = keep_days
+    compression = 'default' if compression is None else (None if compression == 'none' else compression)
+    try:
+        result = backup_database(backup_dir, compression, verify=False if no_verify else None)
+    except ValueError as e:
+        raise click.ClickException(f'Backup failed verification: {e}')
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    rows = ', '.join(f'{n} {table}' for table, n in result['rows'].items())
+    click.echo(f"Backed up {result['pages']} pages ({rows}) to {result['path']} "
+               f"({result['bytes'] / 1024:.0f} KiB) in {result['seconds']}s"
+               + ('; restore verified' if result['verified'] else ''))
+    for name in result['pruned']:
+        click.echo(f'Removed old backup {name}')
+
+
+@app.cli.command('verify-backup')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def verify_backup_cmd(path):
+    """Restore a backup into a temp file and run an integrity check on it."""
+    try:
+        counts = verify_backup(path)
+    except (ValueError, RuntimeError, sqlite3.DatabaseError) as e:
+        raise click.ClickException(str(e))
+    click.echo('OK: ' + ', '.join(f'{n} {table}' for table, n in counts.items()))
 
 
 # -----------------------------------------------------------------------------
@@ -168,6 +2068,77 @@ def ensure_category_column():
             conn.commit()
 
 
+def ensure_thumbnail_column():
+    """Add 'thumbnail_widths' column to products if it doesn't exist (SQLite only)."""
+    with db.engine.connect() as conn:
+        res = conn.execute(text("PRAGMA table_info(products)"))
+        cols = [row[1] for row in res.fetchall()]
+        if 'thumbnail_widths' not in cols:
+            conn.execute(text("ALTER TABLE products ADD COLUMN thumbnail_widths VARCHAR(40)"))
+            conn.commit()
+
+
+def ensure_catalog_triggers():
+    """Seed the catalog_state row and the triggers that keep it current."""
+    bump = (
+        "UPDATE catalog_state SET version = version + 1, "
+        "updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = 1;"
+    )
+    with db.engine.connect() as conn:
+        conn.execute(text(
+            "INSERT OR IGNORE INTO catalog_state (id, version, updated_at) "
+            "VALUES (1, 0, strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+        ))
+        for action in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS trg_products_{action.lower()}_catalog_state "
+                f"AFTER {action} ON products BEGIN {bump} END"
+            ))
+        conn.commit()
+
+
+def ensure_search_index():
+    """Create the products_fts index and its sync triggers (requires FTS5)."""
+    cols = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in SEARCH_COLUMNS)
+    insert_new = f"INSERT INTO products_fts(rowid, {cols}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO products_fts(products_fts, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+    try:
+        with db.engine.connect() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")).first()
+            # The virtual table must exist before the triggers that write to it
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5({cols}, "
+                # Prefix indexes keep as-you-type queries ("cla*") cheap
+                "content='products', content_rowid='id', tokenize='porter unicode61', prefix='2 3')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert "
+                f"AFTER INSERT ON products BEGIN {insert_new} END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete "
+                f"AFTER DELETE ON products BEGIN {delete_old} END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS trg_products_fts_update "
+                f"AFTER UPDATE OF {cols} ON products BEGIN {delete_old} {insert_new} END"
+            ))
+            if not exists:
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            conn.commit()
+    except Exception as e:
+        print(f"Warning: Full-text search unavailable: {e}")
+
+
+def ensure_indexes():
+    """Create model-declared indexes missing from an existing database."""
+    for model_table in (User.__table__, Product.__table__):
+        for index in model_table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
 # -----------------------------------------------------------------------------
 # DB init route (for convenience in dev)
 # -----------------------------------------------------------------------------
@@ -176,6 +2147,10 @@ def init_db_cmd():
     try:
         db.create_all()
         ensure_category_column()
+        ensure_thumbnail_column()
+        ensure_indexes()
+        ensure_catalog_triggers()
+        ensure_search_index()
         print('Database initialized at', DB_PATH)
     except Exception as e:
         print(f'Database initialization failed: {e}')
@@ -196,11 +2171,180 @@ def init_db_cmd():
         try:
             db.create_all()
             ensure_category_column()
+            ensure_thumbnail_column()
+            ensure_indexes()
+            ensure_catalog_triggers()
+            ensure_search_index()
             print('Database initialized successfully after fix')
         except Exception as e2:
             print(f'Database initialization still failed: {e2}')
 
 
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_cmd():
+    """Rebuild the products full-text index from the products table."""
+    ensure_search_index()
+    with db.engine.connect() as conn:
+        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('optimize')"))
+        conn.commit()
+        count = conn.execute(text("SELECT count(*) FROM products")).scalar()
+    click.echo(f'Search index rebuilt ({count} products)')
+
+
+@app.cli.command('backfill-thumbnails')
+@click.option('--all', 'redo_all', is_flag=True, help='Re-render derivatives that already exist.')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True)
+def backfill_thumbnails_cmd(redo_all, workers):
+    """Render image derivatives for existing products."""
+    if Image is None:
+        raise click.ClickException('Pillow is not installed')
+    query = db.select(Product.id, Product.image_path)
+    if not redo_all:
+        query = query.where(Product.thumbnail_widths.is_(None))
+    rows = db.session.execute(query).all()
+
+    def render(row):
+        try:
+            record_thumbnails(row.id, row.image_path, generate_thumbnails(row.image_path, force=redo_all))
+            return None
+        except Exception as e:
+            return f'product {row.id} ({row.image_path}): {e}'
+
+    with ThreadPoolExecutor(workers) as pool:
+        errors = [e for e in pool.map(render, rows) if e]
+    for error in errors:
+        click.echo(f'failed: {error}')
+    click.echo(f'Rendered derivatives for {len(rows) - len(errors)} of {len(rows)} products')
+
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted.')
+@click.option('--grace', type=int, default=None,
+              help='Keep orphans modified within this many seconds (default: UPLOAD_GC_GRACE).')
+def gc_uploads_cmd(dry_run, grace):
+    """Delete uploaded files and thumbnails that no product or user references."""
+    grace = app.config['UPLOAD_GC_GRACE'] if grace is None else grace
+    referenced = set(db.session.scalars(db.select(Product.image_path)))
+    referenced.update(p for p in db.session.scalars(db.select(User.govt_id_path)) if p)
+    referenced_stems = {os.path.splitext(os.path.basename(p))[0] for p in referenced}
+    cutoff = time.time() - grace
+
+    orphans = []
+    for upload_dir in (PRODUCT_UPLOAD_DIR, GOVT_UPLOAD_DIR):
+        for entry in os.scandir(upload_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff \
+                    and static_web_path(entry.path) not in referenced:
+                orphans.append(entry.path)
+    # Derivatives whose source image is gone (e.g. removed by hand)
+    for entry in os.scandir(THUMBNAIL_DIR):
+        stem = entry.name.rsplit('_', 1)[0]
+        stale = entry.name.endswith('.tmp') or (
+            stem not in referenced_stems
+            and not glob.glob(os.path.join(PRODUCT_UPLOAD_DIR, f'{glob.escape(stem)}.*')))
+        if entry.is_file() and entry.stat().st_mtime < cutoff and stale:
+            orphans.append(entry.path)
+
+    freed = 0
+    for path in orphans:
+        if dry_run:
+            click.echo(f'would delete {static_web_path(path)}')
+            freed += os.path.getsize(path)
+        else:
+            freed += remove_upload(path)
+    verb = 'Would free' if dry_run else 'Freed'
+    click.echo(f'{verb} {freed / 1024:.1f} KiB from {len(orphans)} orphaned files')
+
+
+@app.cli.command('import-products')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('--images', 'images_path', type=click.Path(exists=True, dir_okay=False), required=True,
+              help='Zip archive with the images named in the manifest.')
+@click.option('--seller-email', required=True, help='Seller the products belong to.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Default: from the file extension.')
+@click.option('--batch-size', type=int, default=None, help='Rows per insert transaction (default: IMPORT_BATCH_SIZE).')
+@click.option('--workers', type=int, default=None, help='Parallel image writers (default: IMPORT_IMAGE_WORKERS).')
+def import_products_cmd(manifest, images_path, seller_email, fmt, batch_size, workers):
+    """Import products from a CSV/JSONL manifest and a zip of images."""
+    fmt = manifest_format(fmt, manifest)
+    if fmt is None:
+        raise click.ClickException('Cannot tell the manifest format; pass --format csv or --format jsonl')
+    seller = User.query.filter_by(email=seller_email, role='seller').first()
+    if not seller:
+        raise click.ClickException(f'Seller not found: {seller_email}')
+
+    started = time.perf_counter()
+    with open(manifest, 'rb') as stream, zipfile.ZipFile(images_path) as images:
+        report = import_products(
+            seller.id, seller.fullname, read_manifest(stream, fmt), images,
+            batch_size or app.config['IMPORT_BATCH_SIZE'], workers or app.config['IMPORT_IMAGE_WORKERS'],
+            # The background renderer would die with this process
+            render_thumbnails=False,
+        )
+    elapsed = time.perf_counter() - started
+    for error in report['errors']:
+        click.echo(f"row {error['row']}: {error['error']}")
+    rate = report['imported'] / elapsed * 60 if elapsed else 0
+    click.echo(f"Imported {report['imported']} products ({rate:.0f}/min), {report['failed']} rows failed")
+    if report['imported'] and Image is not None:
+        click.echo('Run `flask backfill-thumbnails` to render their thumbnails')
+
+
+@app.cli.command('export')
+@click.argument('table', type=click.Choice(sorted(EXPORT_TABLES)))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--since-id', type=int, default=0, help='Only rows with a larger id (incremental export).')
+@click.option('--since', type=click.DateTime(), default=None, help='Only rows created at or after this time.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True),
+              help='Default: <table>_export.<format>[.gz]; "-" for stdout.')
+def export_cmd(table, fmt, compress, since_id, since, output):
+    """Stream the users or products table to CSV/JSONL (password hashes excluded)."""
+    output = output or f"{table}_export.{fmt}{'.gz' if compress else ''}"
+    state = {}
+    chunks = export_chunks(table, fmt, since_id, since, state)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    else:
+        chunks = (chunk.encode('utf-8') for chunk in chunks)
+    with click.open_file(output, 'wb') as out:
+        for chunk in chunks:
+            out.write(chunk)
+    click.echo(f"Exported {state['rows']} {table} to {output}; next time use --since-id {state['last_id']}",
+               err=output == '-')
+
+
+@app.cli.command('seed')
+@click.option('--users', type=int, default=1000, show_default=True)
+@click.option('--products', type=int, default=10000, show_default=True)
+@click.option('--sellers', type=int, default=None, help='How many of the users are sellers (default: 10%).')
+@click.option('--password', default='password123', show_default=True, help='Password of every seeded user.')
+@click.option('--bcrypt-rounds', type=int, default=4, show_default=True, help='Cost of the shared password hash.')
+@click.option('--batch-size', type=int, default=10000, show_default=True, help='Rows per insert transaction.')
+@click.option('--images', 'images_per_category', type=int, default=8, show_default=True,
+              help='Placeholder images per category.')
+@click.option('--random-seed', type=int, default=None, help='Make the generated data reproducible.')
+def seed_cmd(users, products, sellers, password, bcrypt_rounds, batch_size, images_per_category, random_seed):
+    """Fill the database with synthetic users and products."""
+    started = time.perf_counter()
+
+    def progress(kind, done):
+        elapsed = time.perf_counter() - started
+        click.echo(f'{kind}: {done} inserted ({elapsed:.1f}s)')
+
+    try:
+        summary = seed_database(
+            users, products, password, rounds=bcrypt_rounds, sellers=sellers, batch_size=batch_size,
+            images_per_category=images_per_category, rng=random.Random(random_seed), progress=progress,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    elapsed = time.perf_counter() - started
+    rate = (summary['users'] + summary['products']) / elapsed if elapsed else 0
+    click.echo(f"Seeded {summary['users']} users ({summary['sellers']} sellers) and "
+               f"{summary['products']} products in {elapsed:.1f}s ({rate:.0f} rows/s); password: {password}")
+
+
 @app.cli.command('create-admin')
 @click.option('--fullname', prompt=True)
 @click.option('--email', prompt=True)
@@ -217,14 +2361,403 @@ def create_admin_cmd(fullname, email, password):
             role='admin',
             password_hash=hash_password(password)
         )
-        db.session.add(user)
-        db.session.commit()
+        write_queue.submit(lambda session: session.add(user))
         click.echo(f'Admin created: {email}')
 
 
+def route_query_plans():
+    """Representative statement for every route's query, keyed by a label."""
+    sample_cursor = (datetime.utcnow(), 1)
+    keyset = tuple_(Product.created_at, Product.id) < tuple_(*sample_cursor)
+    queries = {
+        'list_products': product_listing_query(),
+        'list_products?status': product_listing_query('pending'),
+        'list_products?category': product_listing_query(category='pots'),
+        'list_products?status&category': product_listing_query('approved', 'pots'),
+        'list_products?status&category&cursor': product_listing_query('approved', 'pots').filter(keyset).limit(25),
+        'get_product': product_select().where(Product.id == 1),
+        'my_products': seller_products_query(1),
+        'delete_user (products)': Product.query.filter_by(seller_id=1),
+        'release_uploads (product refs)': Product.query.filter_by(image_path='/static/uploads/products/x.jpg'),
+        'release_uploads (user refs)': User.query.filter_by(govt_id_path='/static/uploads/govt_ids/x.pdf'),
+        'login / register (email)': User.query.filter_by(email='someone@example.com'),
+        'seller lookup (email, role)': User.query.filter_by(email='someone@example.com', role='seller'),
+        'list_users': db.select(*USER_COLUMNS).order_by(User.created_at.desc()),
+    }
+    dialect = db.engine.dialect
+    return {
+        label: str(getattr(q, 'statement', q).compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        for label, q in queries.items()
+    }
+
+
+@app.cli.command('check-query-plans')
+def check_query_plans_cmd():
+    """Run EXPLAIN QUERY PLAN on each route query and fail on full table scans."""
+    failures = []
+    with db.engine.connect() as conn:
+        for label, sql in route_query_plans().items():
+            details = [row[3] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+            # 'SCAN products' without 'USING ... INDEX' means every row is read
+            full_scans = [d for d in details if d.startswith('SCAN ') and 'INDEX' not in d]
+            click.echo(f"{'FAIL' if full_scans else 'ok  '} {label}")
+            for detail in details:
+                click.echo(f'       {detail}')
+            if full_scans:
+                failures.append(label)
+    if failures:
+        raise click.ClickException(f"Full table scan in: {', '.join(failures)}")
+
+
+@app.cli.command('bench-bcrypt')
+@click.option('--rounds', 'rounds_list', type=int, multiple=True, help='Work factor(s) to measure (default: 10, 11, 12).')
+@click.option('--duration', type=float, default=3.0, show_default=True, help='Seconds to run per work factor.')
+@click.option('--clients', type=int, default=8, show_default=True, help='Concurrent simulated logins.')
+def bench_bcrypt_cmd(rounds_list, duration, clients):
+    """Measure password verifications per second through the password pool."""
+    click.echo(f'{password_pool.workers} pool workers, {clients} concurrent clients')
+    for rounds in rounds_list or (10, 11, 12):
+        hashed = hash_password('benchmark-password', rounds=rounds)
+        done = [0] * clients
+        deadline = time.perf_counter() + duration
+
+        def client(i):
+            while time.perf_counter() < deadline:
+                try:
+                    check_password('benchmark-password', hashed)
+                    done[i] += 1
+                except PasswordPoolSaturated:
+                    time.sleep(0.001)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        click.echo(f'rounds={rounds:>2}  {sum(done) / elapsed:8.1f} logins/sec')
+
+
+@app.cli.command('bench-serialize')
+@click.option('--repeat', type=int, default=5, show_default=True, help='Passes over the listing per path.')
+@click.option('--status', default=None, help='Only serialize products with this status.')
+def bench_serialize_cmd(repeat, status):
+    """Compare rows/sec of ORM + dict building against the columnar listing path."""
+    def orm_path():
+        # What the listing routes did before: hydrate Product objects, build
+        # each dict from attributes, isoformat() per row, encode with app.json
+        query = Product.query.order_by(Product.created_at.desc(), Product.id.desc())
+        if status:
+            query = query.filter_by(status=status)
+        items = []
+        for p in query.all():
+            thumbnail_url, srcset = product_image_variants(p.image_path, p.thumbnail_widths)
+            items.append({
+                'id': p.id, 'seller_id': p.seller_id, 'seller_name': p.seller_name, 'name': p.name,
+                'price': p.price, 'description': p.description, 'image_url': p.image_path,
+                'thumbnail_url': thumbnail_url, 'srcset': srcset, 'category': p.category,
+                'status': p.status, 'created_at': p.created_at.isoformat(),
+            })
+        body = app.json.dumps(items, separators=(',', ':'))
+        db.session.expunge_all()
+        return len(items), body
+
+    def columnar_path():
+        rows = db.session.execute(product_listing_query(status)).all()
+        return len(rows), dumps_json(serialize_products(rows))
+
+    click.echo(f"encoder: {'orjson' if orjson is not None else 'json (install orjson for the fast path)'}")
+    results = {}
+    for label, path in (('orm', orm_path), ('columnar', columnar_path)):
+        path()  # warm up the page cache and statement cache
+        rows = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            count, body = path()
+            rows += count
+        elapsed = time.perf_counter() - started
+        results[label] = rows / elapsed if elapsed else 0.0
+        click.echo(f'{label:>8}: {results[label]:12.0f} rows/sec  ({count} rows, {len(body) / 1024:.0f} KiB per pass)')
+    if results['orm']:
+        click.echo(f"speedup: {results['columnar'] / results['orm']:.1f}x")
+
+
+@app.cli.command('bench-pragmas')
+@click.option('--queries', type=int, default=2000, show_default=True, help='Timed queries per kind and profile.')
+@click.option('--random-seed', type=int, default=1, show_default=True)
+def bench_pragmas_cmd(queries, random_seed):
+    """Compare read latency under SQLite's default pragmas and under SQLITE_PRAGMAS."""
+    max_id = db.session.scalar(db.select(func.max(Product.id))) or 0
+    approved = db.session.scalar(db.select(func.count(Product.id)).where(Product.status == 'approved'))
+    seller_ids = list(db.session.scalars(db.select(Product.seller_id).distinct().limit(1000)))
+    db.session.rollback()
+    if not max_id:
+        raise click.ClickException('No products to query; run `flask seed` first')
+    workload = {
+        'product': lambda rng: product_select().where(Product.id == rng.randint(1, max_id)),
+        # Deep pages walk much of the index, so they show cache/mmap effects
+        'listing': lambda rng: product_listing_query('approved').limit(24).offset(rng.randrange(max(1, approved))),
+        'seller': lambda rng: seller_products_query(rng.choice(seller_ids)).limit(100),
+    }
+    profiles = {
+        'default': {'busy_timeout': app.config['SQLITE_PRAGMAS']['busy_timeout']},
+        'configured': app.config['SQLITE_PRAGMAS'],
+    }
+    click.echo(f'{max_id} products; {queries} queries per kind; mean/p50/p95 in ms')
+    means = {}
+    for label, profile in profiles.items():
+        engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+        statements = sqlite_pragma_statements(profile)
+        event.listen(engine, 'connect', lambda dbapi_connection, record: [
+            dbapi_connection.execute(statement) for statement in statements
+        ])
+        total = 0.0
+        with engine.connect() as conn:
+            for kind, build in workload.items():
+                rng = random.Random(random_seed)  # same queries for every profile
+                for _ in range(queries // 4):
+                    conn.execute(build(rng)).all()  # warm up
+                timings = []
+                for _ in range(queries):
+                    query = build(rng)
+                    started = time.perf_counter()
+                    conn.execute(query).all()
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                mean = sum(timings) / len(timings)
+                total += mean
+                click.echo(f'{label:>10} {kind:>8}: {mean:8.3f} {timings[len(timings) // 2]:8.3f} '
+                           f'{timings[int(len(timings) * 0.95)]:8.3f}')
+        engine.dispose()
+        means[label] = total
+    if means['configured']:
+        click.echo(f"speedup (sum of means): {means['default'] / means['configured']:.2f}x")
+
+
+# -----------------------------------------------------------------------------
+# Request metrics (Prometheus text format on /metrics)
+# -----------------------------------------------------------------------------
+def _prometheus_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Per-endpoint latency and SQL histograms plus upload byte counters.
+
+    SQL statements are counted in a thread-local while a request runs and
+    folded into the shared tables once at teardown, so the lock is taken once
+    per request rather than once per statement. Statements run outside a
+    request (write queue, background threads) are recorded as "(background)".
+    """
+
+    def __init__(self, latency_buckets, sql_buckets):
+        self.latency_buckets = tuple(latency_buckets)
+        self.sql_buckets = tuple(sql_buckets)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._latency = {}  # (endpoint, method) -> [bucket counts, sum]
+        self._sql_per_request = {}  # endpoint -> [bucket counts, sum]
+        self._requests = {}  # (endpoint, method, status) -> count
+        self._sql = {}  # endpoint -> [statements, seconds]
+        self._uploads = {}  # kind -> [files, bytes]
+
+    @staticmethod
+    def _observe(table, key, buckets, value):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [[0] * (len(buckets) + 1), 0]
+        entry[0][bisect.bisect_left(buckets, value)] += 1
+        entry[1] += value
+
+    def instrument(self, engine):
+        """Count statements and their time on every connection of engine."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.sql_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        local = self._local
+        elapsed = time.perf_counter() - local.sql_started
+        if getattr(local, 'started', None) is not None:
+            local.statements += 1
+            local.sql_seconds += elapsed
+        elif app.config['METRICS_ENABLED']:
+            with self._lock:
+                totals = self._sql.setdefault('(background)', [0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+
+    def start_request(self):
+        local = self._local
+        local.started = time.perf_counter()
+        local.statements = 0
+        local.sql_seconds = 0.0
+        local.status = None
+
+    def set_status(self, status: int):
+        if getattr(self._local, 'started', None) is not None:
+            self._local.status = status
+
+    def finish_request(self, endpoint: str, method: str, failed: bool) -> tuple | None:
+        """Record the current request; returns (seconds, statements, sql_seconds)."""
+        local = self._local
+        if getattr(local, 'started', None) is None:
+            return None
+        elapsed = time.perf_counter() - local.started
+        local.started = None
+        # Unhandled exceptions skip after_request, so no status was set
+        status = 500 if failed or local.status is None else local.status
+        with self._lock:
+            self._observe(self._latency, (endpoint, method), self.latency_buckets, elapsed)
+            self._observe(self._sql_per_request, endpoint, self.sql_buckets, local.statements)
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            totals = self._sql.setdefault(endpoint, [0, 0.0])
+            totals[0] += local.statements
+            totals[1] += local.sql_seconds
+        return elapsed, local.statements, local.sql_seconds
+
+    def record_upload(self, kind: str, size: int):
+        if not app.config['METRICS_ENABLED']:
+            return
+        with self._lock:
+            totals = self._uploads.setdefault(kind, [0, 0])
+            totals[0] += 1
+            totals[1] += size
+
+    def _histogram(self, lines, name, help_text, table, buckets, labels):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, (counts, total) in sorted(table.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            label_text = ','.join(f'{label}="{_prometheus_label(v)}"' for label, v in zip(labels, key))
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_text}}} {total}')
+            lines.append(f'{name}_count{{{label_text}}} {cumulative}')
+
+    @staticmethod
+    def _samples(lines, name, help_text, samples, kind='counter'):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{_prometheus_label(v)}"' for k, v in labels.items())
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            self._histogram(lines, 'craftchain_http_request_duration_seconds',
+                            'Time from routing to the last byte of the response.',
+                            self._latency, self.latency_buckets, ('endpoint', 'method'))
+            self._samples(lines, 'craftchain_http_requests_total', 'Requests by endpoint, method and status.', [
+                ({'endpoint': e, 'method': m, 'status': s}, n) for (e, m, s), n in sorted(self._requests.items())
+            ])
+            self._histogram(lines, 'craftchain_sql_statements_per_request',
+                            'SQL statements executed while serving one request.',
+                            self._sql_per_request, self.sql_buckets, ('endpoint',))
+            sql = sorted(self._sql.items())
+            self._samples(lines, 'craftchain_sql_statements_total', 'SQL statements executed.',
+                          [({'endpoint': e}, n) for e, (n, _) in sql])
+            self._samples(lines, 'craftchain_sql_seconds_total', 'Time spent executing SQL statements.',
+                          [({'endpoint': e}, round(t, 6)) for e, (_, t) in sql])
+            uploads = sorted(self._uploads.items())
+            self._samples(lines, 'craftchain_upload_files_total', 'Uploaded files received.',
+                          [({'kind': k}, n) for k, (n, _) in uploads])
+            self._samples(lines, 'craftchain_upload_bytes_total', 'Uploaded bytes received.',
+                          [({'kind': k}, b) for k, (_, b) in uploads])
+        queue_stats = write_queue.stats()
+        for key, help_text in (
+            ('batches', 'Write-queue transactions committed.'),
+            ('jobs', 'Write jobs committed.'),
+            ('lock_retries', 'Write-queue commits retried after "database is locked".'),
+            ('lock_failures', 'Write-queue commits that stayed locked through every retry.'),
+        ):
+            self._samples(lines, f'craftchain_write_queue_{key}_total', help_text, [({}, queue_stats[key])])
+        cache_stats = catalog_cache.stats()
+        for key in ('hits', 'misses', 'evictions', 'invalidations'):
+            self._samples(lines, f'craftchain_catalog_cache_{key}_total', f'Catalog cache {key}.',
+                          [({}, cache_stats[key])])
+        maintenance_stats = maintenance.stats()
+        self._samples(lines, 'craftchain_sqlite_wal_bytes', 'Size of the SQLite write-ahead log.',
+                      [({}, maintenance_stats['wal_bytes'])], kind='gauge')
+        self._samples(lines, 'craftchain_maintenance_runs_total', 'Database maintenance tasks completed.',
+                      [({'task': name}, n) for name, n in sorted(maintenance_stats['runs'].items())])
+        self._samples(lines, 'craftchain_thumbnails_pending', 'Images waiting for thumbnails.',
+                      [({}, thumbnail_worker.stats()['pending'])], kind='gauge')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics(app.config['METRICS_LATENCY_BUCKETS'], app.config['METRICS_SQL_BUCKETS'])
+with app.app_context():
+    metrics.instrument(db.engine)
+
+
+@app.before_request
+def start_request_metrics():
+    if app.config['METRICS_ENABLED']:
+        metrics.start_request()
+
+
+@app.after_request
+def record_response_status(response):
+    metrics.set_status(response.status_code)
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Runs after a streamed body has been sent, so latency covers all of it
+    recorded = metrics.finish_request(request.endpoint or '(unmatched)', request.method, exc is not None)
+    slow = app.config['METRICS_SLOW_REQUEST_SECONDS']
+    if recorded and slow is not None and recorded[0] >= slow:
+        elapsed, statements, sql_seconds = recorded
+        app.logger.warning('Slow request: %s %s took %.3fs (%d SQL statements, %.3fs in SQL)',
+                           request.method, request.path, elapsed, statements, sql_seconds)
+
+
+@app.get('/metrics')
+def metrics_endpoint():
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 # -----------------------------------------------------------------------------
 # Auth routes
 # -----------------------------------------------------------------------------
+@app.errorhandler(RequestEntityTooLarge)
+@app.errorhandler(UnsupportedMediaType)
+def upload_rejected(e):
+    return jsonify({'error': e.description}), e.code
+
+
+@app.errorhandler(WriteQueueTimeout)
+def write_queue_timed_out(e):
+    if e.committing:
+        message = 'Your change is still being saved; check before retrying'
+    else:
+        message = 'Server busy, nothing was saved; please retry shortly'
+    response = jsonify({'error': message})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(app.config['WRITE_QUEUE_RETRY_AFTER'])
+    return response
+
+
+@app.errorhandler(PasswordPoolSaturated)
+def password_pool_saturated(e):
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(app.config['PASSWORD_POOL_RETRY_AFTER'])
+    return response
+
+
 @app.post('/api/register/buyer')
 def register_buyer():
     data = request.form
@@ -245,19 +2778,12 @@ def register_buyer():
         password_hash=hash_password(data['password'])
     )
     
-    # Retry logic for database operations to handle locks
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            db.session.add(user)
-            db.session.commit()
-            break
-        except Exception as e:
-            db.session.rollback()
-            if attempt == max_retries - 1:
-                return jsonify({'error': f'Registration failed: {str(e)}'}), 500
-            import time
-            time.sleep(0.1 * (attempt + 1))  # Exponential backoff
+    try:
+        write_queue.submit(lambda session: session.add(user))
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Registration failed: {str(e)}'}), 500
     
     return jsonify({'message': 'Buyer registered successfully'}), 201
 
@@ -292,19 +2818,12 @@ def register_seller():
         govt_id_path=govt_path,
     )
     
-    # Retry logic for database operations to handle locks
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            db.session.add(user)
-            db.session.commit()
-            break
-        except Exception as e:
-            db.session.rollback()
-            if attempt == max_retries - 1:
-                return jsonify({'error': f'Registration failed: {str(e)}'}), 500
-            import time
-            time.sleep(0.1 * (attempt + 1))  # Exponential backoff
+    try:
+        write_queue.submit(lambda session: session.add(user))
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Registration failed: {str(e)}'}), 500
     
     return jsonify({'message': 'Seller registered successfully'}), 201
 
@@ -335,8 +2854,9 @@ def login():
             'role': user.role,
         }
     }
+    payload['token'] = generate_token(user.id, user.role)
     if user.role == 'admin':
-        payload['admin_token'] = generate_admin_token(user.id)
+        payload['admin_token'] = payload['token']
     return jsonify(payload), 200
 
 
@@ -346,14 +2866,14 @@ def login():
 @app.post('/api/products')
 def create_product():
     data = request.form
-    required = ['seller_email', 'seller_name', 'product_name', 'price', 'description', 'category']
+    required = ['seller_name', 'product_name', 'price', 'description', 'category']
     for f in required:
         if not data.get(f):
             return jsonify({'error': f'Missing field: {f}'}), 400
 
-    user = User.query.filter_by(email=data['seller_email'], role='seller').first()
-    if not user:
-        return jsonify({'error': 'Seller not found'}), 404
+    seller_id, error = authenticate_seller()
+    if error:
+        return error
 
     if 'product_image' not in request.files:
         return jsonify({'error': 'Product image is required'}), 400
@@ -375,7 +2895,7 @@ def create_product():
         return jsonify({'error': 'Invalid category. Must be one of pots, wood, metal'}), 400
 
     product = Product(
-        seller_id=user.id,
+        seller_id=seller_id,
         seller_name=data['seller_name'],
         name=data['product_name'],
         price=price,
@@ -385,124 +2905,334 @@ def create_product():
         status='pending'
     )
     
-    # Retry logic for database operations to handle locks
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            db.session.add(product)
-            db.session.commit()
-            break
-        except Exception as e:
-            db.session.rollback()
-            if attempt == max_retries - 1:
-                return jsonify({'error': f'Database error: {str(e)}'}), 500
-            import time
-            time.sleep(0.1 * (attempt + 1))  # Exponential backoff
+    def apply(session):
+        # A token can outlive its account (or seller role); check in the same transaction
+        seller = session.get(User, seller_id)
+        if seller is None or seller.role != 'seller':
+            return False
+        session.add(product)
+        return True
+
+    try:
+        created = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if not created:
+        return jsonify({'error': 'Seller not found'}), 404
+    thumbnail_worker.enqueue(product.id, image_path)
 
+    # New products start as pending, so the cached approved catalog is unaffected
     return jsonify({'message': 'Product submitted for approval', 'id': product.id, 'status': product.status}), 201
 
 
+@app.post('/api/products/import')
+def import_products_api():
+    """Bulk import (seller only): multipart `manifest` (CSV/JSONL) and `images` (zip)."""
+    seller_id, error = authenticate_seller()
+    if error:
+        return error
+    seller_name = db.session.scalar(db.select(User.fullname).filter_by(id=seller_id, role='seller'))
+    if seller_name is None:
+        return jsonify({'error': 'Seller not found'}), 404
+
+    manifest = request.files.get('manifest')
+    if not manifest or not manifest.filename:
+        return jsonify({'error': 'manifest file is required'}), 400
+    fmt = manifest_format(request.form.get('format'), manifest.filename)
+    if fmt is None:
+        return jsonify({'error': 'Manifest must be CSV or JSONL'}), 400
+    images = request.files.get('images')
+    if not images or not images.filename:
+        return jsonify({'error': 'images zip is required'}), 400
+    try:
+        archive = zipfile.ZipFile(images.stream)
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'images must be a zip archive'}), 400
+
+    with archive:
+        report = import_products(
+            seller_id, seller_name, read_manifest(manifest.stream, fmt), archive,
+            app.config['IMPORT_BATCH_SIZE'], app.config['IMPORT_IMAGE_WORKERS'],
+        )
+    return jsonify(report)
+
+
 @app.get('/api/products')
 def list_products():
     status = request.args.get('status')
     category = request.args.get('category')
-    query = Product.query
     if status in {'pending', 'approved', 'rejected'}:
         # If requesting anything other than approved, require admin token
         if status != 'approved':
-            auth = request.headers.get('Authorization', '')
-            token = auth.replace('Bearer ', '') if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
-            admin_id = verify_admin_token(token) if token else None
-            if not admin_id:
+            if not authorize_admin():
                 return jsonify({'error': 'Admin authorization required'}), 401
-        query = query.filter_by(status=status)
-    if category:
-        normalized_category = category.strip().lower()
-        query = query.filter_by(category=normalized_category)
-    products = query.order_by(Product.created_at.desc()).all()
-    return jsonify([
-        {
-            'id': p.id,
-            'seller_id': p.seller_id,
-            'seller_name': p.seller_name,
-            'name': p.name,
-            'price': p.price,
-            'description': p.description,
-            'image_url': p.image_path,
-            'category': p.category,
-            'status': p.status,
-            'created_at': p.created_at.isoformat()
-        }
-        for p in products
-    ])
+    else:
+        status = None
+    normalized_category = category.strip().lower() if category else None
+
+    # format=ndjson streams the whole listing (limit/cursor do not apply)
+    if request.args.get('format') == 'ndjson':
+        etag, last_modified = get_catalog_state()
+        response = not_modified(etag, last_modified)
+        if response:
+            return response
+        return with_validators(
+            ndjson_response(product_listing_query(status, normalized_category), serialize_products),
+            etag, last_modified,
+        )
+
+    # Pagination is opt-in so existing callers still get the full list
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    limit = cursor = None
+    if paginated:
+        try:
+            limit = int(request.args.get('limit', app.config['PRODUCTS_DEFAULT_PAGE_SIZE']))
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+        if limit < 1:
+            return jsonify({'error': 'Invalid limit'}), 400
+        limit = min(limit, app.config['PRODUCTS_MAX_PAGE_SIZE'])
+        cursor = request.args.get('cursor') or None
+        if cursor:
+            try:
+                after_created_at, after_id = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+    etag, last_modified = get_catalog_state()
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    # The public approved catalog is served from the in-process cache
+    cache_key = None
+    if status == 'approved' and app.config['CATALOG_CACHE_ENABLED'] and etag is not None:
+        cache_key = (normalized_category, limit, cursor)
+        body, cache_version = catalog_cache.lookup(cache_key, etag)
+        if body is not None:
+            return with_validators(json_response(body), etag, last_modified)
+
+    query = product_listing_query(status, normalized_category)
+    if paginated:
+        if cursor:
+            query = query.filter(
+                tuple_(Product.created_at, Product.id) < tuple_(after_created_at, after_id)
+            )
+        # Fetch one extra row to learn whether another page exists
+        query = query.limit(limit + 1)
+    products = db.session.execute(query).all()
+
+    next_cursor = None
+    if paginated and len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(products[-1].created_at, products[-1].id)
+
+    items = serialize_products(products)
+    payload = {'items': items, 'next_cursor': next_cursor} if paginated else items
+    body = dumps_json(payload)
+    if cache_key is not None:
+        catalog_cache.put(cache_key, body, cache_version, etag, last_modified)
+    return with_validators(json_response(body), etag, last_modified)
+
+
+@app.get('/api/products/search')
+def search_products():
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = int(request.args.get('limit', app.config['PRODUCTS_DEFAULT_PAGE_SIZE']))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    limit = min(limit, app.config['PRODUCTS_MAX_PAGE_SIZE'])
+
+    etag, last_modified = get_catalog_state()
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    match = fts_match_expression(q)
+    products = []
+    if match:
+        # Rank narrow (id, score) rows first so the sort never carries full
+        # product rows, then load just the requested page.
+        rank = func.bm25(text('products_fts'), *SEARCH_WEIGHTS).label('rank')
+        ranked = (
+            db.select(Product.id, rank)
+            .join(products_fts, products_fts.c.rowid == Product.id)
+            .where(text('products_fts MATCH :match').bindparams(match=match), Product.status == 'approved')
+            .order_by(rank, Product.id)
+            # Fetch one extra row to learn whether another page exists
+            .offset(offset)
+            .limit(limit + 1)
+            .subquery()
+        )
+        query = product_select().join(ranked, ranked.c.id == Product.id).order_by(ranked.c.rank, Product.id)
+        try:
+            products = db.session.execute(query).all()
+        except OperationalError as e:
+            db.session.rollback()
+            return jsonify({'error': f'Search unavailable: {e.orig}'}), 503
+
+    next_offset = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_offset = offset + limit
+    return with_validators(json_response(dumps_json({
+        'items': serialize_products(products),
+        'next_offset': next_offset,
+    })), etag, last_modified)
 
 
 @app.get('/api/products/<int:product_id>')
 def get_product(product_id: int):
-    p = Product.query.get(product_id)
-    if not p:
+    # Existence first: a deleted product must not revalidate as 304
+    row = db.session.execute(product_select().where(Product.id == product_id)).first()
+    if not row:
         return jsonify({'error': 'Product not found'}), 404
-    return jsonify({
-        'id': p.id,
-        'seller_id': p.seller_id,
-        'seller_name': p.seller_name,
-        'name': p.name,
-        'price': p.price,
-        'description': p.description,
-        'image_url': p.image_path,
-        'category': p.category,
-        'status': p.status,
-        'created_at': p.created_at.isoformat()
-    })
+    etag, last_modified = get_catalog_state()
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+    return with_validators(json_response(dumps_json(serialize_products([row])[0])), etag, last_modified)
 
 
 @app.patch('/api/products/<int:product_id>/status')
+@admin_required
 def update_product_status(product_id: int):
-    # Require admin token
-    auth = request.headers.get('Authorization', '')
-    token = auth.replace('Bearer ', '') if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
-    admin_id = verify_admin_token(token) if token else None
-    if not admin_id:
-        return jsonify({'error': 'Admin authorization required'}), 401
-
     data = request.get_json(silent=True) or {}
     new_status = data.get('status')
-    if new_status not in {'pending', 'approved', 'rejected'}:
+    if new_status not in ('pending', 'approved', 'rejected'):
         return jsonify({'error': 'Invalid status'}), 400
 
-    product = Product.query.get(product_id)
-    if not product:
+    def apply(session):
+        product = session.get(Product, product_id)
+        if product is None:
+            return None
+        old_status, product.status = product.status, new_status
+        return old_status, product.category
+
+    try:
+        result = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if result is None:
         return jsonify({'error': 'Product not found'}), 404
 
-    product.status = new_status
-    db.session.commit()
-    return jsonify({'message': 'Status updated', 'id': product.id, 'status': product.status})
+    old_status, category = result
+    if 'approved' in (old_status, new_status):
+        catalog_cache.invalidate(category)
+    return jsonify({'message': 'Status updated', 'id': product_id, 'status': new_status})
+
+
+@app.patch('/api/products/status')
+@admin_required
+def bulk_update_product_status():
+    """Moderate many products in one transaction.
+
+    Body: {"status": ..., "ids": [...]} or a filter with any of
+    "seller_id", "category" and "current_status" (e.g. all pending pots).
+    """
+    data = request.get_json(silent=True) or {}
+    new_status = data.get('status')
+    if new_status not in ('pending', 'approved', 'rejected'):
+        return jsonify({'error': 'Invalid status'}), 400
+
+    ids = data.get('ids')
+    conditions = []
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return jsonify({'error': 'ids must be a non-empty list of product ids'}), 400
+        if len(ids) > app.config['BULK_MODERATION_MAX_IDS']:
+            return jsonify({'error': f"At most {app.config['BULK_MODERATION_MAX_IDS']} ids per request"}), 400
+        conditions.append(Product.id.in_(ids))
+    seller_id = data.get('seller_id')
+    if seller_id is not None:
+        if not isinstance(seller_id, int) or isinstance(seller_id, bool):
+            return jsonify({'error': 'seller_id must be a user id'}), 400
+        conditions.append(Product.seller_id == seller_id)
+    if data.get('category'):
+        conditions.append(Product.category == str(data['category']).strip().lower())
+    current_status = data.get('current_status')
+    if current_status:
+        if current_status not in ('pending', 'approved', 'rejected'):
+            return jsonify({'error': 'Invalid current_status'}), 400
+        conditions.append(Product.status == current_status)
+    if not conditions:
+        # Never moderate the whole catalog by accident
+        return jsonify({'error': 'Provide ids or a filter (seller_id, category, current_status)'}), 400
+
+    max_rows = app.config['BULK_MODERATION_MAX_IDS']
+
+    def apply(session):
+        matched = session.execute(
+            db.select(Product.id, Product.status, Product.category).where(*conditions).limit(max_rows + 1)
+        ).all()
+        if len(matched) > max_rows:
+            return None  # filter too broad; change nothing
+        # One statement for the whole batch; rows already in the target status
+        # are left alone so they don't bump the catalog version
+        session.execute(
+            db.update(Product).where(*conditions, Product.status != new_status).values(status=new_status)
+        )
+        return matched
+
+    try:
+        matched = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if matched is None:
+        return jsonify({'error': f'Filter matches more than {max_rows} products; narrow it or send ids'}), 400
+
+    results = []
+    touched_categories = set()
+    for product_id, old_status, category in matched:
+        results.append({
+            'id': product_id,
+            'result': 'unchanged' if old_status == new_status else 'updated',
+            'previous_status': old_status,
+            'status': new_status,
+        })
+        if old_status != new_status and 'approved' in (old_status, new_status):
+            touched_categories.add(category)
+    found = {r['id'] for r in results}
+    results.extend({'id': i, 'result': 'not_found'} for i in dict.fromkeys(ids or []) if i not in found)
+    if touched_categories:
+        catalog_cache.invalidate(*touched_categories)
+
+    return jsonify({
+        'status': new_status,
+        'updated': sum(r['result'] == 'updated' for r in results),
+        'unchanged': sum(r['result'] == 'unchanged' for r in results),
+        'not_found': sum(r['result'] == 'not_found' for r in results),
+        'results': results,
+    })
 
 
 @app.get('/api/my-products')
 def my_products():
-    seller_email = request.args.get('seller_email')
-    if not seller_email:
-        return jsonify({'error': 'seller_email is required'}), 400
-    user = User.query.filter_by(email=seller_email, role='seller').first()
-    if not user:
-        return jsonify({'error': 'Seller not found'}), 404
-    products = Product.query.filter_by(seller_id=user.id).order_by(Product.created_at.desc()).all()
-    return jsonify([
-        {
-            'id': p.id,
-            'seller_id': p.seller_id,
-            'seller_name': p.seller_name,
-            'name': p.name,
-            'price': p.price,
-            'description': p.description,
-            'image_url': p.image_path,
-            'category': p.category,
-            'status': p.status,
-            'created_at': p.created_at.isoformat()
-        }
-        for p in products
-    ])
+    seller_id, error = authenticate_seller()
+    if error:
+        return error
+    etag, last_modified = get_catalog_state()
+    if etag is not None:
+        # Listings differ per seller, so the validator must too
+        etag = f'{etag}-s{seller_id}'
+    response = not_modified(etag, last_modified)
+    if response is None:
+        products = db.session.execute(seller_products_query(seller_id)).all()
+        response = with_validators(json_response(dumps_json(serialize_products(products))), etag, last_modified)
+    response.vary.add('Authorization')
+    return response
 
 
 @app.put('/api/products/<int:product_id>')
@@ -516,102 +3246,122 @@ def update_product(product_id: int):
         return jsonify({'error': 'Product not found'}), 404
     
     # Verify seller ownership
-    seller_email = data.get('seller_email')
-    if not seller_email:
-        return jsonify({'error': 'seller_email is required'}), 400
-    
-    user = User.query.filter_by(email=seller_email, role='seller').first()
-    if not user or product.seller_id != user.id:
+    seller_id, error = authenticate_seller()
+    if error:
+        return error
+    if product.seller_id != seller_id:
         return jsonify({'error': 'You can only update your own products'}), 403
+
+    # Edits send the product back to pending, which removes it from the catalog
+    was_approved = product.status == 'approved'
+    old_category = product.category
+    old_image = product.image_path
     
-    # Update fields
+    # Collect field updates; the write itself happens in the write queue
+    changes = {}
     if 'product_name' in data and data['product_name'].strip():
-        product.name = data['product_name'].strip()
+        changes['name'] = data['product_name'].strip()
     
     if 'price' in data:
         try:
             price = float(data['price'])
             if price <= 0:
                 return jsonify({'error': 'Price must be greater than 0'}), 400
-            product.price = price
+            changes['price'] = price
         except ValueError:
             return jsonify({'error': 'Invalid price'}), 400
     
     if 'description' in data and data['description'].strip():
-        product.description = data['description'].strip()
+        changes['description'] = data['description'].strip()
     
     if 'category' in data and data['category'].strip():
         normalized_category = data['category'].strip().lower()
         allowed_categories = {'pots', 'wood', 'metal'}
         if normalized_category not in allowed_categories:
             return jsonify({'error': 'Invalid category. Must be one of pots, wood, metal'}), 400
-        product.category = normalized_category
+        changes['category'] = normalized_category
     
     # Handle image update if provided
     if 'product_image' in request.files and request.files['product_image'].filename:
         try:
-            image_path = save_file(request.files['product_image'], PRODUCT_UPLOAD_DIR)
-            product.image_path = image_path
+            changes['image_path'] = save_file(request.files['product_image'], PRODUCT_UPLOAD_DIR)
+            changes['thumbnail_widths'] = None
         except Exception as e:
             return jsonify({'error': f'Image upload failed: {e}'}), 400
     
     # Reset status to pending when updated
-    product.status = 'pending'
+    changes['status'] = 'pending'
     
-    # Save with retry logic
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            db.session.commit()
-            break
-        except Exception as e:
-            db.session.rollback()
-            if attempt == max_retries - 1:
-                return jsonify({'error': f'Database error: {str(e)}'}), 500
-            import time
-            time.sleep(0.1 * (attempt + 1))
+    def apply(session):
+        # A token can outlive the seller role; check in the same transaction
+        seller = session.get(User, seller_id)
+        if seller is None or seller.role != 'seller':
+            return False
+        session.execute(db.update(Product).where(Product.id == product_id).values(**changes))
+        return True
+
+    try:
+        updated = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if not updated:
+        return jsonify({'error': 'Seller not found'}), 404
+    if 'image_path' in changes:
+        thumbnail_worker.enqueue(product_id, changes['image_path'])
+        if changes['image_path'] != old_image:
+            release_uploads(old_image)
+
+    if was_approved:
+        catalog_cache.invalidate(old_category)
     
     return jsonify({
         'message': 'Product updated successfully and is pending approval',
-        'id': product.id,
-        'status': product.status
+        'id': product_id,
+        'status': changes['status']
     })
 
 
 @app.delete('/api/products/<int:product_id>')
 def delete_product(product_id: int):
     """Delete product (seller only)."""
-    data = request.get_json(silent=True) or {}
-    
     # Get product
     product = Product.query.get(product_id)
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
     # Verify seller ownership
-    seller_email = data.get('seller_email')
-    if not seller_email:
-        return jsonify({'error': 'seller_email is required'}), 400
-    
-    user = User.query.filter_by(email=seller_email, role='seller').first()
-    if not user or product.seller_id != user.id:
+    seller_id, error = authenticate_seller()
+    if error:
+        return error
+    if product.seller_id != seller_id:
         return jsonify({'error': 'You can only delete your own products'}), 403
     
     # Delete product
-    db.session.delete(product)
-    
-    # Save with retry logic
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            db.session.commit()
-            break
-        except Exception as e:
-            db.session.rollback()
-            if attempt == max_retries - 1:
-                return jsonify({'error': f'Database error: {str(e)}'}), 500
-            import time
-            time.sleep(0.1 * (attempt + 1))
+    was_approved = product.status == 'approved'
+    category = product.category
+    image_path = product.image_path
+    def apply(session):
+        # A token can outlive the seller role; check in the same transaction
+        seller = session.get(User, seller_id)
+        if seller is None or seller.role != 'seller':
+            return False
+        session.execute(db.delete(Product).where(Product.id == product_id))
+        return True
+
+    try:
+        deleted = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if not deleted:
+        return jsonify({'error': 'Seller not found'}), 404
+    release_uploads(image_path)
+
+    if was_approved:
+        catalog_cache.invalidate(category)
     
     return jsonify({'message': 'Product deleted successfully'})
 
@@ -620,84 +3370,214 @@ def delete_product(product_id: int):
 # User management routes (admin only)
 # -----------------------------------------------------------------------------
 @app.get('/api/users')
+@admin_required
 def list_users():
-    # Require admin token
-    auth = request.headers.get('Authorization', '')
-    token = auth.replace('Bearer ', '') if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
-    admin_id = verify_admin_token(token) if token else None
-    if not admin_id:
-        return jsonify({'error': 'Admin authorization required'}), 401
-
-    users = User.query.order_by(User.created_at.desc()).all()
-    return jsonify([
-        {
-            'id': u.id,
-            'fullname': u.fullname,
-            'email': u.email,
-            'role': u.role,
-            'phone': u.phone,
-            'address': u.address,
-            'created_at': u.created_at.isoformat() if u.created_at else None
-        }
-        for u in users
-    ])
+    query = db.select(*USER_COLUMNS).order_by(User.created_at.desc())
+    if request.args.get('format') == 'ndjson':
+        return ndjson_response(query, serialize_users)
+    return json_response(dumps_json(serialize_users(db.session.execute(query))))
 
 
 @app.patch('/api/users/<int:user_id>/role')
+@admin_required
 def update_user_role(user_id: int):
-    # Require admin token
-    auth = request.headers.get('Authorization', '')
-    token = auth.replace('Bearer ', '') if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
-    admin_id = verify_admin_token(token) if token else None
-    if not admin_id:
-        return jsonify({'error': 'Admin authorization required'}), 401
-
     data = request.get_json(silent=True) or {}
     new_role = data.get('role')
     if new_role not in {'admin', 'seller', 'buyer'}:
         return jsonify({'error': 'Invalid role'}), 400
 
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    def apply(session):
+        user = session.get(User, user_id)
+        if user is None:
+            return False
+        user.role = new_role
+        return True
 
-    user.role = new_role
-    db.session.commit()
-    return jsonify({'message': 'Role updated', 'id': user.id, 'role': user.role})
+    try:
+        found = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if not found:
+        return jsonify({'error': 'User not found'}), 404
+    token_cache.discard_user(user_id)
+    return jsonify({'message': 'Role updated', 'id': user_id, 'role': new_role})
 
 
 @app.delete('/api/users/<int:user_id>')
+@admin_required
 def delete_user(user_id: int):
-    # Require admin token
-    auth = request.headers.get('Authorization', '')
-    token = auth.replace('Bearer ', '') if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
-    admin_id = verify_admin_token(token) if token else None
-    if not admin_id:
-        return jsonify({'error': 'Admin authorization required'}), 401
-
     # Prevent deleting yourself
-    if admin_id == user_id:
+    if g.admin_id == user_id:
         return jsonify({'error': 'Cannot delete your own account'}), 400
 
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    def apply(session):
+        user = session.get(User, user_id)
+        if user is None:
+            return None
+        # Files to release once the rows are gone
+        paths = list(session.scalars(db.select(Product.image_path).where(Product.seller_id == user_id)))
+        paths.append(user.govt_id_path)
+        # Delete associated products first
+        session.execute(db.delete(Product).where(Product.seller_id == user_id))
+        session.delete(user)
+        return paths
 
-    # Delete associated products first
-    Product.query.filter_by(seller_id=user_id).delete()
-    
-    db.session.delete(user)
-    db.session.commit()
+    try:
+        paths = write_queue.submit(apply)
+    except WriteQueueTimeout:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if paths is None:
+        return jsonify({'error': 'User not found'}), 404
+    token_cache.discard_user(user_id)
+    catalog_cache.invalidate()
+    release_uploads(*paths)
     return jsonify({'message': 'User deleted successfully'})
 
 
+@app.get('/api/admin/stats')
+@admin_required
+def admin_stats():
+    return jsonify({
+        'catalog_cache': catalog_cache.stats(),
+        'write_queue': write_queue.stats(),
+        'auth_tokens': token_cache.stats(),
+        'auth_timings': auth_timings.stats(),
+        'thumbnails': thumbnail_worker.stats(),
+        'sqlite': sqlite_settings(),
+        'maintenance': maintenance.stats(),
+    })
+
+
+@app.get('/api/admin/export/<table_name>')
+@admin_required
+def admin_export(table_name: str):
+    """Stream a table as CSV/JSONL; ?format=, ?gzip=1, ?since_id=, ?since=<ISO time>."""
+    if table_name not in EXPORT_TABLES:
+        return jsonify({'error': 'Unknown table'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in {'csv', 'jsonl'}:
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+    try:
+        since_id = int(request.args.get('since_id', 0))
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since_id or since'}), 400
+
+    filename = f'{table_name}_export.{fmt}'
+    chunks = export_chunks(table_name, fmt, since_id, since)
+    if request.args.get('gzip') in {'1', 'true'}:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
 # -----------------------------------------------------------------------------
 # Static files helper (optional convenience)
 # -----------------------------------------------------------------------------
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.svg', '.json', '.txt'}
+
+
+class PrecompressedAssets:
+    """In-memory identity/gzip/brotli copies of small text assets.
+
+    Each file is compressed once (at maximum level) and rebuilt only when its
+    mtime or size changes, so edits show up without a restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, path: str) -> dict:
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(path)
+        if entry is None or entry['key'] != key:
+            with open(path, 'rb') as f:
+                data = f.read()
+            variants = {'identity': data}
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    variants['br'] = compressed
+            entry = {
+                'key': key,
+                'variants': variants,
+                'etag': hashlib.sha256(data).hexdigest()[:20],
+                'last_modified': datetime.fromtimestamp(st.st_mtime, timezone.utc),
+                'mimetype': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            }
+            with self._lock:
+                self._entries[path] = entry
+        return entry
+
+    def preload(self, *directories):
+        for directory in directories:
+            for name in os.listdir(directory):
+                if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                    self.get(os.path.join(directory, name))
+
+
+precompressed_assets = PrecompressedAssets()
+
+
+def send_asset(directory: str, filename: str, max_age: int | None = None):
+    """Serve a text asset from memory in the best encoding the client accepts."""
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    asset = precompressed_assets.get(path)
+    accepted = request.accept_encodings
+    encoding = next((e for e in ('br', 'gzip') if e in asset['variants'] and accepted[e]), 'identity')
+    body = asset['variants'][encoding]
+
+    resp = app.response_class(body, mimetype=asset['mimetype'])
+    if encoding != 'identity':
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    # Each encoding is a different byte sequence, so it needs its own validator
+    resp.set_etag(f"{asset['etag']}-{encoding}")
+    resp.last_modified = asset['last_modified']
+    resp.accept_ranges = 'bytes'
+    if max_age is None:
+        resp.cache_control.no_cache = True
+    else:
+        resp.cache_control.public = True
+        resp.cache_control.max_age = max_age
+    return resp.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+
+@app.endpoint('static')
+def static_asset(filename):
+    max_age = app.config['ASSET_MAX_AGE']
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        return send_asset(STATIC_DIR, filename, max_age)
+    return send_from_directory(STATIC_DIR, filename, max_age=max_age)
+
+
 @app.get('/static/uploads/<path:filename>')
 def uploaded_file(filename):
     # allow direct serving of uploaded files in dev
-    return send_from_directory(UPLOAD_DIR, filename)
+    resp = send_from_directory(UPLOAD_DIR, filename, max_age=app.config['UPLOAD_MAX_AGE'])
+    # Content-addressed (or uuid) names are never reused for different bytes
+    resp.cache_control.immutable = True
+    if filename.startswith('govt_ids/'):
+        resp.cache_control.public = False
+        resp.cache_control.private = True
+    return resp
 
 
 # -----------------------------------------------------------------------------
@@ -705,47 +3585,47 @@ def uploaded_file(filename):
 # -----------------------------------------------------------------------------
 @app.get('/')
 def page_home():
-    return send_from_directory(TEMPLATES_DIR, 'explore.html')
+    return send_asset(TEMPLATES_DIR, 'explore.html')
 
 
 @app.get('/explore')
 def page_explore():
-    return send_from_directory(TEMPLATES_DIR, 'explore.html')
+    return send_asset(TEMPLATES_DIR, 'explore.html')
 
 
 @app.get('/register')
 def page_register():
-    return send_from_directory(TEMPLATES_DIR, 'register.html')
+    return send_asset(TEMPLATES_DIR, 'register.html')
 
 
 @app.get('/login')
 def page_login():
-    return send_from_directory(TEMPLATES_DIR, 'login.html')
+    return send_asset(TEMPLATES_DIR, 'login.html')
 
 
 @app.get('/seller')
 def page_seller():
-    return send_from_directory(TEMPLATES_DIR, 'seller.html')
+    return send_asset(TEMPLATES_DIR, 'seller.html')
 
 
 @app.get('/admin')
 def page_admin():
-    return send_from_directory(TEMPLATES_DIR, 'admin.html')
+    return send_asset(TEMPLATES_DIR, 'admin.html')
 
 
 @app.get('/pots')
 def page_pots():
-    return send_from_directory(TEMPLATES_DIR, 'pots.html')
+    return send_asset(TEMPLATES_DIR, 'pots.html')
 
 
 @app.get('/wood')
 def page_wood():
-    return send_from_directory(TEMPLATES_DIR, 'wood.html')
+    return send_asset(TEMPLATES_DIR, 'wood.html')
 
 
 @app.get('/metal')
 def page_metal():
-    return send_from_directory(TEMPLATES_DIR, 'metal.html')
+    return send_asset(TEMPLATES_DIR, 'metal.html')
 
 
 # -----------------------------------------------------------------------------
@@ -753,20 +3633,220 @@ def page_metal():
 # -----------------------------------------------------------------------------
 @app.get('/pics/<path:filename>')
 def serve_pics(filename):
-    return send_from_directory(PICS_DIR, filename)
+    return send_from_directory(PICS_DIR, filename, max_age=app.config['ASSET_MAX_AGE'])
 
 
 @app.get('/logos/<path:filename>')
 def serve_logos(filename):
-    return send_from_directory(LOGOS_DIR, filename)
+    return send_from_directory(LOGOS_DIR, filename, max_age=app.config['ASSET_MAX_AGE'])
 
 
-if __name__ == '__main__':
+# -----------------------------------------------------------------------------
+# Production server (flask serve)
+# -----------------------------------------------------------------------------
+def prepare_database():
+    """Create tables and run the lightweight migrations (once, before serving)."""
     with app.app_context():
-        
         db.create_all()
         ensure_category_column()
-    port = int(os.environ.get('PORT', 5002))
-    app.run(host='127.0.0.1', port=port, debug=True)
+        ensure_thumbnail_column()
+        ensure_indexes()
+        ensure_catalog_triggers()
+        ensure_search_index()
+        settings = sqlite_settings()
+    print('SQLite settings: ' + ', '.join(f'{name}={value}' for name, value in settings.items()))
+
+
+class ServeRequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # A keep-alive connection occupies a pool thread while idle
+        self.timeout = app.config['SERVE_SOCKET_TIMEOUT']
+        super().setup()
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server that handles connections on a fixed-size thread pool.
+
+    Unlike the dev server's thread-per-connection, a burst of clients queues
+    for a free thread instead of spawning unbounded threads.
+    """
 
+    multithread = True
 
+    def __init__(self, host: str, port: int, threads: int, fd: int | None = None):
+        super().__init__(host, port, app, handler=ServeRequestHandler, fd=fd)
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self, timeout: float) -> bool:
+        """Stop accepting and wait for in-flight requests; False if they outlived timeout."""
+        self.server_close()  # other workers keep accepting on the shared socket
+        waiter = threading.Thread(target=self.pool.shutdown, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        return not waiter.is_alive()
+
+
+def run_worker(fd: int, ready_fd: int | None, threads: int):
+    """Serve on an inherited listening socket until SIGTERM, then drain and exit."""
+    server = PooledWSGIServer('127.0.0.1', 0, threads, fd=fd)
+    precompressed_assets.preload(TEMPLATES_DIR, STATIC_DIR)
+    # Ctrl+C reaches the whole process group; the master decides what happens
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    if ready_fd is not None:
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+    server.serve_forever()
+    if not server.drain(app.config['SERVE_GRACEFUL_TIMEOUT']):
+        print(f'Worker {os.getpid()}: requests still running after the graceful timeout', file=sys.stderr)
+    os._exit(0)  # don't wait on daemon threads (write queue, thumbnails)
+
+
+class Supervisor:
+    """Pre-fork master: owns the listening socket and keeps `workers` processes on it.
+
+    Workers are fresh interpreters started with the socket passed down, so
+    SIGHUP loads new code: a new generation is started and, once every new
+    worker is listening, the old one is told to finish its requests and
+    exit. If the new generation fails to start, the old one keeps serving.
+    """
+
+    def __init__(self, sock: socket.socket, workers: int, threads: int):
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.procs = []
+        self._reload = False
+        self._stop = False
+
+    def spawn(self, ready_pipe: bool = False):
+        """Start one worker; returns (process, read end of its ready pipe or None)."""
+        cmd = [
+            sys.executable, '-m', 'flask', '--app', os.path.abspath(__file__), 'serve',
+            '--worker-fd', str(self.sock.fileno()), '--threads', str(self.threads),
+        ]
+        if not ready_pipe:
+            return subprocess.Popen(cmd, pass_fds=(self.sock.fileno(),)), None
+        ready_read, ready_write = os.pipe()
+        try:
+            proc = subprocess.Popen(cmd + ['--ready-fd', str(ready_write)], pass_fds=(self.sock.fileno(), ready_write))
+        finally:
+            os.close(ready_write)
+        return proc, ready_read
+
+    def start_generation(self) -> list | None:
+        """Start a full set of workers; None (and nothing left running) if any fails."""
+        started = [self.spawn(ready_pipe=True) for _ in range(self.workers)]
+        deadline = time.monotonic() + app.config['SERVE_READY_TIMEOUT']
+        ok = True
+        for proc, ready in started:
+            readable, _, _ = select.select([ready], [], [], max(0.0, deadline - time.monotonic()))
+            ok = ok and bool(readable) and os.read(ready, 1) == b'1'
+            os.close(ready)
+        procs = [proc for proc, _ in started]
+        if not ok:
+            self.stop_workers(procs)
+            return None
+        return procs
+
+    def stop_workers(self, procs):
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        deadline = time.monotonic() + app.config['SERVE_GRACEFUL_TIMEOUT'] + 5
+        for proc in procs:
+            try:
+                proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda signum, frame: setattr(self, '_reload', True))
+        signal.signal(signal.SIGTERM, lambda signum, frame: setattr(self, '_stop', True))
+        signal.signal(signal.SIGINT, lambda signum, frame: setattr(self, '_stop', True))
+        self.procs = self.start_generation()
+        if self.procs is None:
+            raise click.ClickException('Workers failed to start')
+        click.echo(f'Started {self.workers} workers x {self.threads} threads (master pid {os.getpid()})')
+        while not self._stop:
+            if self._reload:
+                self._reload = False
+                click.echo('Reloading: starting a new generation of workers')
+                procs = self.start_generation()
+                if procs is None:
+                    click.echo('Reload failed: new workers did not start; keeping the current ones', err=True)
+                else:
+                    old, self.procs = self.procs, procs
+                    self.stop_workers(old)
+                    click.echo('Reload complete')
+            for i, proc in enumerate(self.procs):
+                if proc.poll() is not None and not self._stop:
+                    click.echo(f'Worker {proc.pid} exited with {proc.returncode}; restarting', err=True)
+                    self.procs[i], _ = self.spawn()
+            time.sleep(0.5)
+        click.echo('Stopping workers')
+        self.stop_workers(self.procs)
+
+
+@app.cli.command('serve')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', type=int, default=lambda: int(os.environ.get('PORT', 5002)), help='Default: $PORT or 5002.')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: one per CPU).')
+@click.option('--threads', type=int, default=None, help='Request threads per worker (default: 8).')
+@click.option('--pid-file', type=click.Path(dir_okay=False), default=None,
+              help='Write the master pid here (send it SIGHUP to reload, SIGTERM to stop).')
+@click.option('--worker-fd', type=int, default=None, hidden=True)
+@click.option('--ready-fd', type=int, default=None, hidden=True)
+def serve_cmd(host, port, workers, threads, pid_file, worker_fd, ready_fd):
+    """Run the production server: pre-forked workers, thread pools, graceful reload."""
+    threads = threads or app.config['SERVE_THREADS']
+    if worker_fd is not None:
+        run_worker(worker_fd, ready_fd, threads)
+        return
+    workers = workers or app.config['SERVE_WORKERS']
+    prepare_database()
+    if pid_file:
+        with open(pid_file, 'w') as f:
+            f.write(str(os.getpid()))
+    try:
+        if workers == 1 or not hasattr(os, 'fork'):
+            # Windows (no fd passing / SIGHUP) and --workers 1: one process, thread pool only
+            server = PooledWSGIServer(host, port, threads)
+            precompressed_assets.preload(TEMPLATES_DIR, STATIC_DIR)
+            click.echo(f'Serving on http://{host}:{port} with {threads} threads')
+            signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            server.drain(app.config['SERVE_GRACEFUL_TIMEOUT'])
+            return
+        sock = socket.create_server((host, port), backlog=1024)
+        sock.set_inheritable(True)
+        click.echo(f'Serving on http://{host}:{port}')
+        Supervisor(sock, workers, threads).run()
+        sock.close()
+    finally:
+        if pid_file and os.path.exists(pid_file):
+            os.remove(pid_file)
+
+
+if __name__ == '__main__':
+    prepare_database()
+    precompressed_assets.preload(TEMPLATES_DIR, STATIC_DIR)
+    port = int(os.environ.get('PORT', 5002))
+    app.run(host='127.0.0.1', port=port, debug=True)
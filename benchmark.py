@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+CraftChain API Benchmark
+Seeds a throwaway SQLite database, drives the main API routes through the
+Flask test client and/or a real threaded WSGI server, and reports
+p50/p95/p99 latency and throughput per route as JSON.
+
+    python benchmark.py --products 20000 --output results.json
+    python benchmark.py --baseline results.json   # exit 1 on regression
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import http.client
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ('list_products', 'get_product', 'login', 'create_product', 'update_product_status')
+PASSWORD = 'benchmark-password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the CraftChain API.')
+    parser.add_argument('--users', type=int, default=200, help='Seeded users (sellers + buyers).')
+    parser.add_argument('--products', type=int, default=5000, help='Seeded products.')
+    parser.add_argument('--requests', type=int, default=300, help='Measured requests per route.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads.')
+    parser.add_argument('--mode', choices=['test-client', 'server', 'both'], default='both')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='Only run these routes (repeatable; default: all).')
+    parser.add_argument('--bcrypt-rounds', type=int, default=None,
+                        help='Work factor for seeded passwords (default: the app default).')
+    parser.add_argument('--db', help='SQLite file to use (default: a fresh temporary file).')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for reproducible runs.')
+    parser.add_argument('--output', help='Write JSON results here (default: stdout).')
+    parser.add_argument('--baseline', help='Compare against an earlier JSON result file.')
+    parser.add_argument('--tolerance', type=float, default=0.20,
+                        help='Allowed relative p95 increase / throughput drop vs the baseline.')
+    return parser.parse_args()
+
+
+def load_app(args):
+    """Import backend/app.py pointed at the benchmark database."""
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='craftchain-bench-'), 'bench.db')
+    os.environ['CRAFTCHAIN_DB_PATH'] = db_path
+    # Uploads and thumbnails from create_product belong with the database, not the working tree
+    os.environ['CRAFTCHAIN_UPLOAD_DIR'] = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'uploads')
+    if args.bcrypt_rounds:
+        os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+    sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+    import app as craftchain
+    with craftchain.app.app_context():
+        craftchain.db.create_all()
+        craftchain.ensure_category_column()
+        craftchain.ensure_thumbnail_column()
+        craftchain.ensure_indexes()
+        craftchain.ensure_catalog_triggers()
+        craftchain.ensure_search_index()
+    return craftchain, db_path
+
+
+def seed(craftchain, args):
+    """Insert users and products with a few batched executemany calls."""
+    rng = random.Random(args.seed)
+    with craftchain.app.app_context():
+        db = craftchain.db
+        if db.session.query(craftchain.User.id).first():
+            return  # reusing a --db that is already seeded
+        password_hash = craftchain.hash_password(PASSWORD)
+        now = datetime.utcnow()
+        sellers = max(1, args.users // 10)
+        users = [{'fullname': 'Bench Admin', 'email': 'admin@bench.local', 'role': 'admin',
+                  'password_hash': password_hash, 'created_at': now}]
+        for i in range(args.users):
+            role = 'seller' if i < sellers else 'buyer'
+            users.append({'fullname': f'{role.title()} {i}', 'email': f'{role}{i}@bench.local', 'role': role,
+                          'password_hash': password_hash, 'created_at': now - timedelta(minutes=i)})
+        db.session.execute(db.insert(craftchain.User), users)
+        seller_ids = db.session.scalars(db.select(craftchain.User.id).filter_by(role='seller')).all()
+        batch = []
+        for i in range(args.products):
+            batch.append({
+                'seller_id': rng.choice(seller_ids), 'seller_name': 'Bench Seller',
+                'name': f'Handmade item {i}', 'price': round(rng.uniform(50, 5000), 2),
+                'description': 'Benchmark product with a short description',
+                'image_path': '/static/uploads/products/bench.jpg',
+                'category': rng.choice(('pots', 'wood', 'metal')),
+                'status': rng.choices(('approved', 'pending', 'rejected'), (70, 25, 5))[0],
+                'created_at': now - timedelta(seconds=i),
+            })
+            if len(batch) == 5000:
+                db.session.execute(db.insert(craftchain.Product), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(craftchain.Product), batch)
+        db.session.commit()
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: {content_type}\r\n\r\n'.encode())
+        body.write(data + b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+def sample_image(craftchain):
+    """Small JPEG posted by create_product; identical bytes dedup to one stored file."""
+    if craftchain.Image is None:
+        return b'\xff\xd8\xff\xe0' + b'benchmark image bytes' * 20
+    buf = io.BytesIO()
+    craftchain.Image.new('RGB', (640, 480), (181, 101, 29)).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+class TestClientTransport:
+    """Requests through Flask's test client (no sockets); one client per thread."""
+
+    name = 'test_client'
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, headers=None, body=None, content_type=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers or {}, data=body, content_type=content_type)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerTransport:
+    """Requests over HTTP to a threaded werkzeug server on a free local port."""
+
+    name = 'server'
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like a real client
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+
+    def request(self, method, path, headers=None, body=None, content_type=None):
+        headers = dict(headers or {})
+        if content_type:
+            headers['Content-Type'] = content_type
+        for attempt in range(2):
+            conn = getattr(self.local, 'conn', None)
+            if conn is None:
+                conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                self.local.conn = None
+                if attempt:
+                    raise
+
+    def close(self):
+        self.server.shutdown()
+
+
+def build_scenarios(craftchain, transport, rng):
+    """Map route name -> callable(i) returning the HTTP status of one request."""
+    with craftchain.app.app_context():
+        db = craftchain.db
+        product_ids = db.session.scalars(db.select(craftchain.Product.id)).all()
+        seller_email = db.session.scalar(db.select(craftchain.User.email).filter_by(role='seller'))
+        admin_token = craftchain.generate_token(
+            db.session.scalar(db.select(craftchain.User.id).filter_by(role='admin')), 'admin')
+        seller_token = craftchain.generate_token(
+            db.session.scalar(db.select(craftchain.User.id).filter_by(email=seller_email)), 'seller')
+
+    image = sample_image(craftchain)
+    login_body = json.dumps({'email': seller_email, 'password': PASSWORD}).encode()
+    categories = ('pots', 'wood', 'metal')
+
+    def list_products(i):
+        return transport.request('GET', f'/api/products?status=approved&category={categories[i % 3]}&limit=24')
+
+    def get_product(i):
+        return transport.request('GET', f'/api/products/{rng.choice(product_ids)}')
+
+    def login(i):
+        return transport.request('POST', '/api/login', body=login_body, content_type='application/json')
+
+    def create_product(i):
+        body, content_type = encode_multipart(
+            {'seller_name': 'Bench Seller', 'product_name': f'New item {i}', 'price': '499',
+             'description': 'Created by the benchmark', 'category': categories[i % 3]},
+            {'product_image': ('bench.jpg', image, 'image/jpeg')},
+        )
+        return transport.request('POST', '/api/products', body=body, content_type=content_type,
+                                 headers={'Authorization': f'Bearer {seller_token}'})
+
+    def update_product_status(i):
+        body = json.dumps({'status': ('approved', 'rejected')[i % 2]}).encode()
+        return transport.request('PATCH', f'/api/products/{rng.choice(product_ids)}/status', body=body,
+                                 content_type='application/json',
+                                 headers={'Authorization': f'Bearer {admin_token}'})
+
+    return {
+        'list_products': list_products,
+        'get_product': get_product,
+        'login': login,
+        'create_product': create_product,
+        'update_product_status': update_product_status,
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(fn, total, concurrency):
+    """Run `total` calls of fn across `concurrency` threads; return latency stats."""
+    for i in range(min(10, total)):
+        fn(i)  # warm-up: caches, statement cache, connections
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        local_latencies = []
+        local_errors = 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                status = fn(i)
+            except Exception:
+                status = None
+            local_latencies.append(time.perf_counter() - started)
+            if status is None or status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'requests': total,
+        'errors': errors[0],
+        'throughput_rps': round(total / elapsed, 1) if elapsed else None,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List of human-readable regressions of results against baseline."""
+    regressions = []
+    for mode, scenarios in results['results'].items():
+        for name, current in scenarios.items():
+            before = baseline.get('results', {}).get(mode, {}).get(name)
+            if not before:
+                continue
+            if before.get('p95_ms') and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+            if before.get('throughput_rps') and current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+                regressions.append(
+                    f"{mode}/{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+            if current['errors'] > before.get('errors', 0):
+                regressions.append(f"{mode}/{name}: errors {before.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    craftchain, db_path = load_app(args)
+    print(f'Seeding {args.users} users / {args.products} products into {db_path}', file=sys.stderr)
+    started = time.perf_counter()
+    seed(craftchain, args)
+    print(f'Seeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    modes = ['test-client', 'server'] if args.mode == 'both' else [args.mode]
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'users': args.users,
+            'products': args.products,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'bcrypt_rounds': craftchain.app.config['BCRYPT_ROUNDS'],
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    for mode in modes:
+        transport = TestClientTransport(craftchain.app) if mode == 'test-client' else ServerTransport(craftchain.app)
+        try:
+            scenarios = build_scenarios(craftchain, transport, random.Random(args.seed))
+            mode_results = results['results'][transport.name] = {}
+            for name in args.scenario or SCENARIOS:
+                stats = run_scenario(scenarios[name], args.requests, args.concurrency)
+                mode_results[name] = stats
+                print(f"{transport.name:>11} {name:<22} {stats['throughput_rps']:>9} req/s  "
+                      f"p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms  "
+                      f"errors {stats['errors']}", file=sys.stderr)
+        finally:
+            transport.close()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against the baseline', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,6 @@ This script fixes database locking issues and reinitializes the database if need
 import os
 import sys
 import sqlite3
-import shutil
 from datetime import datetime
 
 # Add the backend directory to the path
@@ -18,7 +17,15 @@ def backup_database(db_path):
     if os.path.exists(db_path):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"{db_path}.backup_{timestamp}"
-        shutil.copy2(db_path, backup_path)
+        # The backup API copies a consistent snapshot even if the app still has
+        # the database open, including anything not yet checkpointed from the WAL
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(backup_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
         print(f"Database backed up to: {backup_path}")
         return backup_path
     return None
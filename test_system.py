@@ -5,9 +5,15 @@ Tests all major functionality after fixes
 """
 
 import requests
+import base64
 import json
 import time
 
+# 1x1 white PNG for upload tests
+TINY_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC'
+)
+
 def test_service():
     """Test if the CraftChain service is running."""
     print("Testing CraftChain Service...")
@@ -71,6 +77,44 @@ def test_service():
     except Exception as e:
         print(f"❌ Products API error: {e}")
     
+    # Test 5: Editing a product without choosing a new image
+    # (the seller form still sends the empty file input, with filename="")
+    try:
+        seller_data = {
+            'fullname': 'Test Seller',
+            'email': f'seller{int(time.time())}@test.com',
+            'phone': '1234567890',
+            'address_location': 'Test Address',
+            'payment_details': 'Test UPI',
+            'password': 'test123456'
+        }
+        response = requests.post(f"{base_url}/api/register/seller", data=seller_data,
+                                 files={'govt_id': ('id.png', TINY_PNG, 'image/png')}, timeout=10)
+        response.raise_for_status()
+        response = requests.post(f"{base_url}/api/login", data={
+            'email': seller_data['email'], 'password': seller_data['password']}, timeout=10)
+        headers = {'Authorization': f"Bearer {response.json()['token']}"}
+        response = requests.post(f"{base_url}/api/products", headers=headers, data={
+            'seller_name': seller_data['fullname'],
+            'product_name': 'Test Pot',
+            'price': '100',
+            'description': 'Test product',
+            'category': 'pots'
+        }, files={'product_image': ('pot.png', TINY_PNG, 'image/png')}, timeout=10)
+        response.raise_for_status()
+        product_id = response.json()['id']
+
+        response = requests.put(f"{base_url}/api/products/{product_id}", headers=headers,
+                                data={'price': '120'},
+                                files={'product_image': ('', b'', 'application/octet-stream')}, timeout=10)
+        if response.status_code == 200:
+            print("✅ Product edit without a new image working")
+        else:
+            print(f"❌ Product edit without a new image failed: {response.text}")
+        requests.delete(f"{base_url}/api/products/{product_id}", headers=headers, timeout=10)
+    except Exception as e:
+        print(f"❌ Product edit error: {e}")
+    
     print("\n" + "=" * 40)
     print("System test completed!")
     print("If you see ✅ marks, those features are working.")